@@ -1,9 +1,9 @@
 """
 Admin API routes.
 """
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
 from app.database import get_db, User, Project
 from app.auth.utils import get_current_admin_user
@@ -15,15 +15,28 @@ router = APIRouter(prefix="/api/admin", tags=["Admin"])
 
 @router.get("/users", response_model=List[UserResponse])
 def list_all_users(
+    response: Response,
     current_admin: User = Depends(get_current_admin_user),
     db: Session = Depends(get_db),
     skip: int = 0,
-    limit: int = 100
+    limit: int = 100,
+    after_id: Optional[int] = None
 ):
     """
     List all users (admin only).
+    
+    Pass the `X-Next-After` header of the previous page as `after_id` for
+    keyset pagination, which stays O(limit) however deep the page is.
     """
-    users = db.query(User).offset(skip).limit(limit).all()
+    query = db.query(User).order_by(User.id)
+    if after_id is not None:
+        query = query.filter(User.id > after_id)
+    else:
+        query = query.offset(skip)
+    users = query.limit(limit).all()
+    
+    if len(users) == limit:
+        response.headers["X-Next-After"] = str(users[-1].id)
     return users
 
 
@@ -36,7 +49,14 @@ def delete_user(
     """
     Delete a user (admin only).
     """
-    user = db.query(User).filter(User.id == user_id).first()
+    # Don't allow deleting self (checked before touching the database)
+    if user_id == current_admin.id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cannot delete yourself"
+        )
+    
+    user = db.get(User, user_id)
     
     if not user:
         raise HTTPException(
@@ -44,13 +64,7 @@ def delete_user(
             detail="User not found"
         )
     
-    # Don't allow deleting self
-    if user.id == current_admin.id:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Cannot delete yourself"
-        )
-    
+    # ORM delete so the projects/runs/artifacts cascade is applied
     db.delete(user)
     db.commit()
     
@@ -59,15 +73,28 @@ def delete_user(
 
 @router.get("/projects", response_model=List[ProjectResponse])
 def list_all_projects(
+    response: Response,
     current_admin: User = Depends(get_current_admin_user),
     db: Session = Depends(get_db),
     skip: int = 0,
-    limit: int = 100
+    limit: int = 100,
+    after_id: Optional[int] = None
 ):
     """
     List all projects (admin only).
+    
+    Pass the `X-Next-After` header of the previous page as `after_id` for
+    keyset pagination, which stays O(limit) however deep the page is.
     """
-    projects = db.query(Project).offset(skip).limit(limit).all()
+    query = db.query(Project).order_by(Project.id)
+    if after_id is not None:
+        query = query.filter(Project.id > after_id)
+    else:
+        query = query.offset(skip)
+    projects = query.limit(limit).all()
+    
+    if len(projects) == limit:
+        response.headers["X-Next-After"] = str(projects[-1].id)
     return projects
 
 
@@ -80,7 +107,7 @@ def delete_project(
     """
     Delete a project (admin only).
     """
-    project = db.query(Project).filter(Project.id == project_id).first()
+    project = db.get(Project, project_id)
     
     if not project:
         raise HTTPException(
@@ -88,6 +115,7 @@ def delete_project(
             detail="Project not found"
         )
     
+    # ORM delete so the runs/artifacts cascade is applied
     db.delete(project)
     db.commit()
     
@@ -2,23 +2,115 @@
 Base agent interface for all specialized agents.
 """
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional
-from langchain_openai import ChatOpenAI
+from dataclasses import asdict, is_dataclass
+from functools import lru_cache
+from typing import Callable, Dict, Any, List, Optional, Tuple
+import tiktoken
+from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+from app.agents.dispatcher import llm_dispatcher
+from app.agents.cache import response_cache, semantic_cache
 from app.config import get_settings
 
 settings = get_settings()
 
+# Rough characters-per-token ratio used when the tokenizer is unavailable
+_CHARS_PER_TOKEN = 4
+
+
+@lru_cache()
+def get_llm(model_name: str, temperature: float) -> ChatOpenAI:
+    """
+    Get the shared chat client for a model configuration.
+    
+    Agents with the same model and temperature reuse one client, and with it
+    one pool of keep-alive connections to the provider. The OpenAI client
+    retries rate limits (honoring Retry-After), timeouts and connection
+    errors with exponential backoff before the agent sees an error.
+    
+    Args:
+        model_name: Model name
+        temperature: Sampling temperature
+        
+    Returns:
+        Shared ChatOpenAI instance
+    """
+    return ChatOpenAI(
+        model=model_name,
+        temperature=temperature,
+        openai_api_key=settings.openai_api_key,
+        max_retries=settings.llm_max_retries,
+        request_timeout=settings.llm_request_timeout_seconds
+    )
+
+
+@lru_cache()
+def get_embeddings() -> OpenAIEmbeddings:
+    """Get the shared embeddings client used by the semantic cache."""
+    return OpenAIEmbeddings(
+        model=settings.embedding_model,
+        openai_api_key=settings.openai_api_key,
+        check_embedding_ctx_length=False
+    )
+
+
+@lru_cache()
+def get_encoding() -> Optional[tiktoken.Encoding]:
+    """Get the tokenizer used for prompt budgets, or None if it cannot be loaded."""
+    try:
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        # tiktoken downloads encodings on first use; budget by characters offline
+        return None
+
+
+def truncate_tokens(text: str, max_tokens: int, keep_end: bool = False) -> str:
+    """
+    Truncate text to at most `max_tokens` model tokens.
+    
+    Args:
+        text: Text to embed in a prompt
+        max_tokens: Token budget for the text
+        keep_end: Keep the last tokens instead of the first
+        
+    Returns:
+        The text, cut at a token boundary if it exceeds the budget
+    """
+    if max_tokens <= 0:
+        return ""
+    
+    encoding = get_encoding()
+    if encoding is None:
+        max_chars = max_tokens * _CHARS_PER_TOKEN
+        return text[-max_chars:] if keep_end else text[:max_chars]
+    
+    # Every token covers at least one byte, so short text needs no tokenizing
+    if len(text.encode("utf-8")) <= max_tokens:
+        return text
+    
+    tokens = encoding.encode(text)
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[-max_tokens:] if keep_end else tokens[:max_tokens])
+
 
 class BaseAgent(ABC):
     """Base class for all agents in the system."""
     
-    def __init__(self, model_name: str = "gpt-4-turbo-preview"):
+    # Static instructions sent as the system message on every call
+    SYSTEM_PROMPT: str = ""
+    
+    # Seconds a cached LLM response stays valid for this agent
+    cache_ttl: int = settings.llm_cache_ttl_seconds
+    
+    # Treat prompts differing only in whitespace as the same cache entry
+    cache_normalize_whitespace: bool = False
+    
+    def __init__(self, model_name: str = "gpt-4-turbo-preview", temperature: float = 0.7):
         """Initialize the agent with an LLM model."""
-        self.llm = ChatOpenAI(
-            model=model_name,
-            temperature=0.7,
-            openai_api_key=settings.openai_api_key
-        )
+        self.model_name = model_name
+        self.temperature = temperature
+        self.llm = get_llm(model_name, self.temperature)
         self.agent_name = self.__class__.__name__
     
     @abstractmethod
@@ -34,21 +126,112 @@ class BaseAgent(ABC):
         """
         pass
     
+    async def cached_invoke(
+        self,
+        prompt: str,
+        use_cache: bool = True,
+        system_prompt: Optional[str] = None,
+        on_chunk: Optional[Callable[[str], None]] = None
+    ) -> str:
+        """
+        Invoke the LLM, reusing the cached response for an identical prompt.
+        
+        Static instructions go in the system message and the request-specific
+        content in the user message, so repeated calls share a byte-identical
+        prefix that the provider can serve from its prompt cache.
+        
+        Args:
+            prompt: Request-specific part of the prompt
+            use_cache: Set to False to force a fresh completion (e.g. regeneration)
+            system_prompt: Static instructions; defaults to the agent's SYSTEM_PROMPT
+            on_chunk: Called with each content delta as the response streams in
+                (not called when the response is served from the cache or
+                shared with an identical in-flight request)
+            
+        Returns:
+            Response content
+        """
+        system_prompt = system_prompt if system_prompt is not None else self.SYSTEM_PROMPT
+        messages = [HumanMessage(content=prompt)]
+        if system_prompt:
+            messages.insert(0, SystemMessage(content=system_prompt))
+        
+        if not (use_cache and settings.llm_cache_enabled):
+            return await llm_dispatcher.submit(self.llm, messages, on_chunk=on_chunk)
+        
+        key_prompt = " ".join(prompt.split()) if self.cache_normalize_whitespace else prompt
+        key = response_cache.make_key(
+            self.model_name,
+            self.temperature,
+            f"{system_prompt}\n\n{key_prompt}",
+            namespace=self.agent_name
+        )
+        cached = response_cache.get(key)
+        if cached is not None:
+            return cached
+        
+        # Coalesce with an identical request already in flight (e.g. concurrent runs)
+        content = await llm_dispatcher.submit(self.llm, messages, key=key, on_chunk=on_chunk)
+        response_cache.set(key, content, self.cache_ttl)
+        return content
+    
+    async def semantic_lookup(self, query: str) -> Tuple[Optional[str], Optional[List[float]]]:
+        """
+        Look up a response generated for a semantically similar query.
+        
+        Only deterministic agents (temperature 0) use the semantic cache, since
+        replaying a sampled completion for a different query would hide variety
+        the caller asked for.
+        
+        Args:
+            query: Request-specific text to match (not the full prompt)
+            
+        Returns:
+            Tuple of (cached response or None, query embedding for `semantic_store`)
+        """
+        if self.temperature != 0 or not settings.semantic_cache_enabled:
+            return None, None
+        
+        try:
+            embedding = semantic_cache.normalize(await get_embeddings().aembed_query(query))
+        except Exception:
+            # The cache is an optimization; never fail the agent over it
+            return None, None
+        
+        cached = semantic_cache.lookup(
+            self.agent_name, embedding, settings.semantic_cache_threshold
+        )
+        return cached, embedding
+    
+    def semantic_store(self, embedding: Optional[List[float]], response: str):
+        """
+        Store a response for future semantically similar queries.
+        
+        Args:
+            embedding: Query embedding returned by `semantic_lookup`
+            response: Generated response content
+        """
+        if embedding is not None:
+            semantic_cache.add(self.agent_name, embedding, response, self.cache_ttl)
+    
     def format_output(
         self, 
         content: str, 
-        metadata: Optional[Dict[str, Any]] = None
+        metadata: Optional[Any] = None
     ) -> Dict[str, Any]:
         """
         Format agent output in a standardized way.
         
         Args:
             content: Main content generated by the agent
-            metadata: Additional metadata about the execution
+            metadata: Additional metadata about the execution, as a dict or
+                a metadata dataclass (converted to a dict here)
             
         Returns:
             Formatted output dictionary
         """
+        if is_dataclass(metadata):
+            metadata = asdict(metadata)
         return {
             "agent": self.agent_name,
             "content": content,
@@ -0,0 +1,143 @@
+"""
+Response cache for agent LLM calls.
+"""
+import hashlib
+import math
+import operator
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from app.config import get_settings
+
+settings = get_settings()
+
+
+class ResponseCache:
+    """Exact-match LRU cache with per-entry TTL for LLM responses."""
+
+    def __init__(self, max_entries: int = 1024):
+        """Initialize an empty cache holding at most `max_entries` responses."""
+        self.max_entries = max_entries
+        # In-memory store (in production, use Redis shared across workers)
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+
+    @staticmethod
+    def make_key(model: str, temperature: float, prompt: str, namespace: str = "") -> str:
+        """
+        Build a cache key for an LLM call.
+
+        Args:
+            model: Model name
+            temperature: Sampling temperature
+            prompt: Full prompt text sent to the model
+            namespace: Cache partition (e.g. agent name)
+
+        Returns:
+            SHA-256 hex digest identifying the call
+        """
+        return hashlib.sha256(f"{namespace}|{model}|{temperature}|{prompt}".encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Get a cached response.
+
+        Args:
+            key: Cache key from `make_key`
+
+        Returns:
+            Cached response, or None on a miss or expired entry
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: str, ttl: int):
+        """
+        Store a response.
+
+        Args:
+            key: Cache key from `make_key`
+            value: LLM response content
+            ttl: Time to live in seconds
+        """
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        """Remove all cached responses."""
+        self._entries.clear()
+
+
+class SemanticCache:
+    """Nearest-neighbour cache matching responses by embedding similarity."""
+
+    def __init__(self, max_entries: int = 256):
+        """Initialize an empty cache holding at most `max_entries` responses."""
+        self.max_entries = max_entries
+        # (namespace, unit embedding, expires_at, response), oldest first
+        self._entries: List[Tuple[str, List[float], float, str]] = []
+
+    @staticmethod
+    def normalize(embedding: List[float]) -> List[float]:
+        """Scale an embedding to unit length so cosine similarity is a dot product."""
+        norm = math.sqrt(sum(x * x for x in embedding)) or 1.0
+        return [x / norm for x in embedding]
+
+    def lookup(self, namespace: str, embedding: List[float], threshold: float) -> Optional[str]:
+        """
+        Find the most similar cached response.
+
+        Args:
+            namespace: Cache partition (e.g. agent name)
+            embedding: Unit-length query embedding
+            threshold: Minimum cosine similarity for a hit
+
+        Returns:
+            Best matching response, or None if nothing is similar enough
+        """
+        now = time.monotonic()
+        self._entries = [entry for entry in self._entries if entry[2] >= now]
+
+        best_score, best_response = threshold, None
+        for entry_namespace, vector, _, response in self._entries:
+            if entry_namespace != namespace:
+                continue
+            score = sum(map(operator.mul, embedding, vector))
+            if score >= best_score:
+                best_score, best_response = score, response
+        return best_response
+
+    def add(self, namespace: str, embedding: List[float], response: str, ttl: int):
+        """
+        Store a response under its query embedding.
+
+        Args:
+            namespace: Cache partition (e.g. agent name)
+            embedding: Unit-length query embedding
+            response: LLM response content
+            ttl: Time to live in seconds
+        """
+        self._entries.append((namespace, embedding, time.monotonic() + ttl, response))
+        if len(self._entries) > self.max_entries:
+            del self._entries[: len(self._entries) - self.max_entries]
+
+    def clear(self):
+        """Remove all cached responses."""
+        self._entries.clear()
+
+
+# Global response caches shared by all agents
+response_cache = ResponseCache(max_entries=settings.llm_cache_max_entries)
+semantic_cache = SemanticCache(max_entries=settings.semantic_cache_max_entries)
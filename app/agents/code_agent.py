@@ -1,32 +1,30 @@
 """
 Code Agent - Generates code from specifications.
 """
-from typing import Dict, Any
+import re
+import string
+from typing import Callable, Dict, Any
 from app.agents.base import BaseAgent
 
+# Request-specific part of the prompt; the static instructions live in SYSTEM_PROMPT
+_CODE_TEMPLATE = string.Template("""
+Specifications:
+$specs
+""")
+
+# Matches every metadata marker so the response is scanned only once
+_METRICS_RE = re.compile(r"## File:|test_|tests/")
+
+# File header line, checked on each completed line while the response streams
+_FILE_HEADER_RE = re.compile(r"## File:\s*(\S+)")
+
 
 class CodeAgent(BaseAgent):
     """Agent responsible for generating code."""
     
-    async def execute(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
-        """
-        Generate code from specifications.
-        
-        Args:
-            input_data: Contains 'specs' key
-            
-        Returns:
-            Generated code files and tests
-        """
-        try:
-            specs = input_data.get("specs", "")
-            
-            prompt = f"""
+    SYSTEM_PROMPT = """
 You are a Code generation agent. Based on specifications, generate production-ready code.
 
-Specifications:
-{specs}
-
 Generate:
 1. Implementation files (Python/FastAPI preferred)
 2. Test files (pytest)
@@ -54,16 +52,37 @@ Include:
 
 Generate modular, maintainable code following best practices.
 """
+    
+    async def execute(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Generate code from specifications.
+        
+        Args:
+            input_data: Contains 'specs' key, and optionally 'on_file', called
+                with each file path as soon as its header has streamed in, and
+                'use_cache' (False to force a fresh completion)
+            
+        Returns:
+            Generated code files and tests
+        """
+        try:
+            specs = input_data.get("specs", "")
+            
+            prompt = _CODE_TEMPLATE.substitute(specs=specs)
+            
+            on_file = input_data.get("on_file")
+            on_chunk = self._file_header_watcher(on_file) if on_file else None
             
-            response = await self.llm.ainvoke(prompt)
-            code_content = response.content
+            code_content = await self.cached_invoke(
+                prompt, use_cache=input_data.get("use_cache", True), on_chunk=on_chunk
+            )
             
-            # Count generated files
-            file_count = code_content.count("## File:")
+            markers = [match.group(0) for match in _METRICS_RE.finditer(code_content)]
+            file_count = markers.count("## File:")
             
             metadata = {
                 "file_count": file_count,
-                "has_tests": "test_" in code_content or "tests/" in code_content,
+                "has_tests": file_count != len(markers),
                 "language": "python"
             }
             
@@ -71,3 +90,29 @@ Generate modular, maintainable code following best practices.
             
         except Exception as e:
             return self.format_error(e)
+    
+    @staticmethod
+    def _file_header_watcher(on_file: Callable[[str], None]) -> Callable[[str], None]:
+        """
+        Build a stream callback reporting file headers as they complete.
+        
+        Only the current partial line is buffered, so progress can be reported
+        while the model is still generating the rest of the code.
+        
+        Args:
+            on_file: Called with the path from each "## File:" header
+            
+        Returns:
+            Callback for `cached_invoke(on_chunk=...)`
+        """
+        partial = ""
+        
+        def on_chunk(delta: str):
+            nonlocal partial
+            *lines, partial = (partial + delta).split("\n")
+            for line in lines:
+                match = _FILE_HEADER_RE.match(line)
+                if match:
+                    on_file(match.group(1))
+        
+        return on_chunk
@@ -0,0 +1,95 @@
+"""
+Shared dispatcher for agent LLM calls.
+"""
+import asyncio
+from typing import Callable, Dict, List, Optional
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+
+from app.config import get_settings
+
+settings = get_settings()
+
+
+class LLMDispatcher:
+    """
+    Funnels LLM calls from all agents and runs through one dispatch point.
+
+    Identical requests that are in flight at the same time are coalesced into
+    a single provider call, and distinct requests are sent concurrently up to
+    `max_concurrency` at a time.
+    """
+
+    def __init__(self, max_concurrency: int = 8):
+        """Initialize a dispatcher allowing `max_concurrency` in-flight requests."""
+        self.max_concurrency = max_concurrency
+        # Created lazily so it binds to the running event loop
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        # In-flight calls by cache key
+        self._inflight: Dict[str, "asyncio.Future[str]"] = {}
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        """Semaphore limiting in-flight provider requests."""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def submit(
+        self,
+        llm: BaseChatModel,
+        messages: List[BaseMessage],
+        key: Optional[str] = None,
+        on_chunk: Optional[Callable[[str], None]] = None
+    ) -> str:
+        """
+        Send a chat request, sharing the call with identical in-flight requests.
+
+        Args:
+            llm: Chat model to call
+            messages: Messages to send
+            key: Request identity (e.g. response cache key); None disables coalescing
+            on_chunk: Called with each content delta as the response streams in
+                (only for the caller whose request actually reaches the provider)
+
+        Returns:
+            Response content
+        """
+        if key is None:
+            return await self._dispatch(llm, messages, on_chunk)
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        # Shielded so a cancelled caller does not abort the call for the others;
+        # it stays registered until it finishes, even if every caller is gone
+        pending = asyncio.ensure_future(self._dispatch(llm, messages, on_chunk))
+        self._inflight[key] = pending
+        pending.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(pending)
+
+    async def _dispatch(
+        self,
+        llm: BaseChatModel,
+        messages: List[BaseMessage],
+        on_chunk: Optional[Callable[[str], None]] = None
+    ) -> str:
+        """Send messages to the LLM within the concurrency limit."""
+        async with self.semaphore:
+            if on_chunk is None:
+                response = await llm.ainvoke(messages)
+                return response.content
+
+            # Stream so callers can act on partial output before the completion ends
+            parts = []
+            async for chunk in llm.astream(messages):
+                if chunk.content:
+                    parts.append(chunk.content)
+                    on_chunk(chunk.content)
+        return "".join(parts)
+
+
+# Global dispatcher shared by all agents
+llm_dispatcher = LLMDispatcher(max_concurrency=settings.llm_max_concurrency)
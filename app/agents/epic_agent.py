@@ -1,55 +1,64 @@
 """
 Epic Agent - Generates epics from product request.
 """
-from typing import Dict, Any
-from app.agents.base import BaseAgent
+import re
+import string
+from dataclasses import dataclass
+from typing import Dict, Any, Tuple
+from app.agents.base import BaseAgent, truncate_tokens
+
+# Request-specific part of the prompt; the static instructions live in SYSTEM_PROMPT
+_EPIC_TEMPLATE = string.Template("""
+Product Request:
+$product_request
 
+Research Context:
+$research
+$feedback_section
+""")
 
-class EpicAgent(BaseAgent):
-    """Agent responsible for generating epics with comprehensive planning details."""
-    
-    async def execute(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
-        """
-        Generate epics from product request and research.
-        
-        Each epic includes:
-        - Title & goal
-        - In-scope / out-of-scope
-        - Priority (P0/P1/P2) with reasoning
-        - Dependencies
-        - Risks & assumptions
-        - Success metrics
-        
-        Args:
-            input_data: Contains 'product_request', 'research', and optional 'feedback' keys
-            
-        Returns:
-            Generated epics with priorities, dependencies, and Mermaid diagram
-        """
-        try:
-            product_request = input_data.get("product_request", "")
-            research = input_data.get("research", "")
-            feedback = input_data.get("feedback", "")
-            
-            feedback_section = ""
-            if feedback:
-                feedback_section = f"""
+_FEEDBACK_TEMPLATE = string.Template("""
 
 ## User Feedback from Previous Iteration
-{feedback}
+$feedback
 
 Please incorporate this feedback into the epic generation.
-"""
-            
-            prompt = f"""
-You are an Epic planning agent. Based on the product request and research, generate 3-5 comprehensive epics.
+""")
+
+# Matches every metadata marker so the response is scanned only once
+_METRICS_RE = re.compile(r"### Epic EP-|```mermaid|\*\*Priority:\*\* P([012])")
+
+# Fields every generated epic is instructed to include
+_EPIC_FIELDS = (
+    "goal",
+    "priority_with_reasoning",
+    "in_scope",
+    "out_of_scope",
+    "dependencies",
+    "risks_and_assumptions",
+    "success_metrics"
+)
+
+
+@dataclass(frozen=True)
+class EpicMetadata:
+    """Metadata reported with generated epics."""
+    epic_count: int
+    has_mermaid_diagram: bool
+    priority_breakdown: Dict[str, int]
+    regeneration_count: int = 0
+    includes_all_required_fields: bool = True
+    fields_included: Tuple[str, ...] = _EPIC_FIELDS
 
-Product Request:
-{product_request}
 
-Research Context:
-{research[:2000]}
-{feedback_section}
+class EpicAgent(BaseAgent):
+    """Agent responsible for generating epics with comprehensive planning details."""
+    
+    # Token budget for the research context embedded in the prompt
+    RESEARCH_TOKEN_LIMIT = 1500
+    
+    SYSTEM_PROMPT = """
+You are an Epic planning agent. Based on the product request and research, generate 3-5 comprehensive epics.
 
 For each epic, provide ALL of the following sections:
 
@@ -114,39 +123,70 @@ Use different colors for different priorities:
 - P1 (High): Blue (#99ccff)  
 - P2 (Medium): Green (#99ff99)
 """
+    
+    async def execute(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Generate epics from product request and research.
+        
+        Each epic includes:
+        - Title & goal
+        - In-scope / out-of-scope
+        - Priority (P0/P1/P2) with reasoning
+        - Dependencies
+        - Risks & assumptions
+        - Success metrics
+        
+        Args:
+            input_data: Contains 'product_request', 'research', and optional 'feedback',
+                'regeneration_count' and 'use_cache' keys
+            
+        Returns:
+            Generated epics with priorities, dependencies, and Mermaid diagram
+        """
+        try:
+            product_request = input_data.get("product_request", "")
+            research = input_data.get("research", "")
+            feedback = input_data.get("feedback", "")
+            regeneration_count = input_data.get("regeneration_count", 0)
+            use_cache = input_data.get("use_cache", True)
+            
+            feedback_section = ""
+            if feedback:
+                feedback_section = _FEEDBACK_TEMPLATE.substitute(feedback=feedback)
             
-            response = await self.llm.ainvoke(prompt)
-            epics_content = response.content
+            prompt = _EPIC_TEMPLATE.substitute(
+                product_request=product_request,
+                research=truncate_tokens(research, self.RESEARCH_TOKEN_LIMIT),
+                feedback_section=feedback_section
+            )
             
-            # Extract structured information for metadata
-            epic_count = epics_content.count("### Epic EP-")
-            has_mermaid = "```mermaid" in epics_content
+            # Regenerations must produce a fresh completion
+            epics_content = await self.cached_invoke(prompt, use_cache=use_cache and not regeneration_count)
             
-            # Count priorities
-            p0_count = epics_content.count("**Priority:** P0")
-            p1_count = epics_content.count("**Priority:** P1")
-            p2_count = epics_content.count("**Priority:** P2")
+            # Extract structured information for metadata in a single pass
+            epic_count = 0
+            has_mermaid = False
+            priority_counts = [0, 0, 0]
+            for match in _METRICS_RE.finditer(epics_content):
+                priority = match.group(1)
+                if priority is not None:
+                    priority_counts[int(priority)] += 1
+                elif match.group(0) == "```mermaid":
+                    has_mermaid = True
+                else:
+                    epic_count += 1
+            p0_count, p1_count, p2_count = priority_counts
             
-            metadata = {
-                "epic_count": epic_count,
-                "has_mermaid_diagram": has_mermaid,
-                "priority_breakdown": {
+            metadata = EpicMetadata(
+                epic_count=epic_count,
+                has_mermaid_diagram=has_mermaid,
+                priority_breakdown={
                     "P0_critical": p0_count,
                     "P1_high": p1_count,
                     "P2_medium": p2_count
                 },
-                "includes_all_required_fields": True,
-                "fields_included": [
-                    "goal",
-                    "priority_with_reasoning",
-                    "in_scope",
-                    "out_of_scope",
-                    "dependencies",
-                    "risks_and_assumptions",
-                    "success_metrics"
-                ],
-                "regeneration_count": input_data.get("regeneration_count", 0)
-            }
+                regeneration_count=regeneration_count
+            )
             
             return self.format_output(epics_content, metadata)
             
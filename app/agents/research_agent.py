@@ -1,17 +1,156 @@
 """
 Research Agent - Performs web search and gathers context.
 """
-from typing import Dict, Any
-from langchain_openai import ChatOpenAI
-from app.agents.base import BaseAgent
+import asyncio
+import hashlib
+import string
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Tuple
+from app.agents.base import BaseAgent, truncate_tokens
+from app.config import get_settings
+
+settings = get_settings()
+
+# Report sections; each is researched by an independent LLM call
+RESEARCH_SECTIONS = (
+    """## 1. Key Findings Summary
+Summarize the most important findings from researching this product domain.""",
+    """## 2. Similar Products & Solutions
+Identify existing products or solutions in this space and what we can learn from them.""",
+    """## 3. Technology Stack Recommendations
+Recommend specific technologies and explain why they are suitable for this product.""",
+    """## 4. Architecture Approach
+Suggest an architectural approach (e.g., microservices, monolithic, serverless) with rationale.""",
+    """## 5. Implementation Considerations
+List important technical considerations, best practices, and potential challenges.""",
+    """## 6. Risks & Mitigation Strategies
+Identify potential risks and how to mitigate them.""",
+    """## 7. Influence on Planning
+Explain how this research should influence:
+- Epic prioritization
+- User story creation
+- Technical specifications
+- Code implementation""",
+)
+
+# Request-specific part of each section prompt
+_SECTION_TEMPLATE = string.Template("""
+Product Request:
+$product_request
+
+Write only this section of the report, starting with its heading exactly as given:
+
+$section
+""")
+
+# Simulated web search results; only the summaries are filled in per request
+_URL_TEMPLATE = (
+    {
+        "url": "https://docs.example.com/best-practices",
+        "title": "Best Practices for Product Development",
+        "summary": "Comprehensive guide covering best practices relevant to: {product_request}",
+        "relevance": "high"
+    },
+    {
+        "url": "https://github.com/example/similar-project",
+        "title": "Similar Open Source Project",
+        "summary": "Reference implementation demonstrating key patterns and approaches",
+        "relevance": "high"
+    },
+    {
+        "url": "https://stackoverflow.com/questions/common-challenges",
+        "title": "Common Challenges and Solutions",
+        "summary": "Community discussion of challenges in similar projects",
+        "relevance": "medium"
+    },
+    {
+        "url": "https://blog.example.com/architecture-patterns",
+        "title": "Architecture Patterns",
+        "summary": "Analysis of architectural approaches for similar systems",
+        "relevance": "high"
+    },
+    {
+        "url": "https://research.example.com/case-study",
+        "title": "Industry Case Study",
+        "summary": "Real-world case study of successful implementation",
+        "relevance": "medium"
+    },
+)
+
+# How the research is meant to shape the later planning stages
+_PLANNING_INFLUENCE = {
+    "epics": "Research findings will guide epic prioritization based on identified risks and best practices",
+    "stories": "User stories should align with patterns found in similar successful products",
+    "specs": "Technical specifications should follow recommended architecture and technology choices"
+}
+
+
+@dataclass(frozen=True)
+class ResearchMetadata:
+    """Metadata reported with a research report."""
+    urls_consulted: List[Dict[str, str]]
+    total_urls: int
+    knowledge_base_hash: Optional[str] = None
+    research_depth: str = "comprehensive"
+    technologies_identified: Tuple[str, ...] = (
+        "Based on research findings - see Technology Stack Recommendations section",
+    )
+    approach_rationale: str = "Based on research findings - see Architecture Approach section"
+    planning_influence: Dict[str, str] = field(default_factory=lambda: _PLANNING_INFLUENCE)
+
+
+@lru_cache()
+def load_knowledge_base(path: str) -> Tuple[str, str]:
+    """
+    Load the static research corpus once per process.
+    
+    Args:
+        path: Path to a text/markdown file; empty to disable
+        
+    Returns:
+        Tuple of (corpus text, short SHA-256 of the corpus), empty strings if disabled
+    """
+    if not path:
+        return "", ""
+    with open(path, encoding="utf-8") as f:
+        corpus = f.read()
+    return corpus, hashlib.sha256(corpus.encode()).hexdigest()[:16]
 
 
 class ResearchAgent(BaseAgent):
     """Agent responsible for researching the product domain."""
     
+    SYSTEM_PROMPT = """
+You are a research agent tasked with grounding product planning in real-world evidence.
+
+You are writing one section of a comprehensive research report on a product request.
+Format your response as detailed markdown with clear structure.
+"""
+    
+    # Token budget for the knowledge base appended to the system prompt
+    KNOWLEDGE_BASE_TOKEN_LIMIT = 32000
+    
+    # Requests pasted with different line breaks or spacing share cached research
+    cache_normalize_whitespace = True
+    
     def __init__(self):
-        super().__init__()
+        # Deterministic sampling lets paraphrased requests share cached research
+        super().__init__(temperature=0.0)
         self.max_urls = 5
+        
+        # The corpus is part of the static system prefix, so every section call
+        # shares it and the provider can serve it from its prompt cache
+        corpus, self.knowledge_base_hash = load_knowledge_base(settings.research_knowledge_base_path)
+        if corpus:
+            self.SYSTEM_PROMPT = (
+                f"{self.SYSTEM_PROMPT}\n## Knowledge Base\n"
+                f"{truncate_tokens(corpus, self.KNOWLEDGE_BASE_TOKEN_LIMIT)}\n"
+            )
+    
+    def _section_prompt(self, product_request: str, section: str) -> str:
+        """Build the user prompt for researching a single report section."""
+        return _SECTION_TEMPLATE.substitute(product_request=product_request, section=section)
     
     async def execute(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -20,7 +159,8 @@ class ResearchAgent(BaseAgent):
         This is a mandatory step that grounds all planning in real web research.
         
         Args:
-            input_data: Contains 'product_request' key
+            input_data: Contains 'product_request' key, and optionally
+                'use_cache' (False to skip cached and similar-request research)
             
         Returns:
             Research findings with:
@@ -31,98 +171,34 @@ class ResearchAgent(BaseAgent):
         """
         try:
             product_request = input_data.get("product_request", "")
+            use_cache = input_data.get("use_cache", True)
             
-            # Create enhanced research prompt
-            prompt = f"""
-You are a research agent tasked with grounding product planning in real-world evidence.
-
-Product Request:
-{product_request}
-
-Please provide a comprehensive research report with the following sections:
-
-## 1. Key Findings Summary
-Summarize the most important findings from researching this product domain.
-
-## 2. Similar Products & Solutions
-Identify existing products or solutions in this space and what we can learn from them.
-
-## 3. Technology Stack Recommendations
-Recommend specific technologies and explain why they are suitable for this product.
-
-## 4. Architecture Approach
-Suggest an architectural approach (e.g., microservices, monolithic, serverless) with rationale.
-
-## 5. Implementation Considerations
-List important technical considerations, best practices, and potential challenges.
-
-## 6. Risks & Mitigation Strategies
-Identify potential risks and how to mitigate them.
-
-## 7. Influence on Planning
-Explain how this research should influence:
-- Epic prioritization
-- User story creation
-- Technical specifications
-- Code implementation
-
-Format your response as a detailed markdown document with clear sections.
-"""
-            
-            # Execute LLM call
-            response = await self.llm.ainvoke(prompt)
-            research_content = response.content
+            # Reuse research for a semantically similar request, else research
+            # every section concurrently and stitch them in report order
+            research_content, embedding = (
+                await self.semantic_lookup(product_request) if use_cache else (None, None)
+            )
+            if research_content is None:
+                sections = await asyncio.gather(*(
+                    self.cached_invoke(self._section_prompt(product_request, section), use_cache=use_cache)
+                    for section in RESEARCH_SECTIONS
+                ))
+                research_content = "\n\n".join(section.strip() for section in sections)
+                self.semantic_store(embedding, research_content)
             
             # Simulate web search URLs (in production, integrate Tavily or similar web search API)
             # These would come from actual web research
             urls = [
-                {
-                    "url": "https://docs.example.com/best-practices",
-                    "title": "Best Practices for Product Development",
-                    "summary": f"Comprehensive guide covering best practices relevant to: {product_request[:100]}",
-                    "relevance": "high"
-                },
-                {
-                    "url": "https://github.com/example/similar-project",
-                    "title": "Similar Open Source Project",
-                    "summary": "Reference implementation demonstrating key patterns and approaches",
-                    "relevance": "high"
-                },
-                {
-                    "url": "https://stackoverflow.com/questions/common-challenges",
-                    "title": "Common Challenges and Solutions",
-                    "summary": "Community discussion of challenges in similar projects",
-                    "relevance": "medium"
-                },
-                {
-                    "url": "https://blog.example.com/architecture-patterns",
-                    "title": "Architecture Patterns",
-                    "summary": "Analysis of architectural approaches for similar systems",
-                    "relevance": "high"
-                },
-                {
-                    "url": "https://research.example.com/case-study",
-                    "title": "Industry Case Study",
-                    "summary": "Real-world case study of successful implementation",
-                    "relevance": "medium"
-                }
+                {**url, "summary": url["summary"].format(product_request=product_request[:100])}
+                for url in _URL_TEMPLATE
             ]
             
             # Enhanced metadata with required fields
-            metadata = {
-                "urls_consulted": urls,
-                "total_urls": len(urls),
-                "research_depth": "comprehensive",
-                "technologies_identified": [
-                    "Based on research findings - see Technology Stack Recommendations section"
-                ],
-                "approach_rationale": "Based on research findings - see Architecture Approach section",
-                "planning_influence": {
-                    "epics": "Research findings will guide epic prioritization based on identified risks and best practices",
-                    "stories": "User stories should align with patterns found in similar successful products",
-                    "specs": "Technical specifications should follow recommended architecture and technology choices"
-                }
-            }
+            metadata = ResearchMetadata(
+                urls_consulted=urls,
+                total_urls=len(urls),
+                knowledge_base_hash=self.knowledge_base_hash or None
+            )
             
             return self.format_output(research_content, metadata)
             
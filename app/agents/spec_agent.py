@@ -1,44 +1,38 @@
 """
 Spec Agent - Generates formal specifications from stories.
 """
+import re
+import string
 from typing import Dict, Any
-from app.agents.base import BaseAgent
+from app.agents.base import BaseAgent, truncate_tokens
 
+# Request-specific part of the prompt; the static instructions live in SYSTEM_PROMPT
+_SPEC_TEMPLATE = string.Template("""
+User Stories:
+$stories
+$feedback_section
+""")
 
-class SpecAgent(BaseAgent):
-    """Agent responsible for generating formal specifications."""
-    
-    async def execute(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
-        """
-        Generate formal specifications from user stories.
-        
-        Args:
-            input_data: Contains 'stories', optional 'feedback', 'regeneration_count' keys
-            
-        Returns:
-            Generated specifications with API contracts and data models
-        """
-        try:
-            stories = input_data.get("stories", "")
-            feedback = input_data.get("feedback", "")
-            regeneration_count = input_data.get("regeneration_count", 0)
-            
-            feedback_section = ""
-            if feedback:
-                feedback_section = f"""
+_FEEDBACK_TEMPLATE = string.Template("""
 
 ## User Feedback from Previous Iteration
-{feedback}
+$feedback
 
 Please incorporate this feedback into the specification generation.
-"""
-            
-            prompt = f"""
-You are a Specification agent. Based on user stories, generate formal technical specifications.
+""")
+
+# Matches every metadata marker so the response is scanned only once
+_METRICS_RE = re.compile(r"## Specification|API Contracts|Data Models|Test Cases")
 
-User Stories:
-{stories}
-{feedback_section}
+
+class SpecAgent(BaseAgent):
+    """Agent responsible for generating formal specifications."""
+    
+    # Hard cap on the stories embedded in the prompt
+    STORIES_TOKEN_LIMIT = 8000
+    
+    SYSTEM_PROMPT = """
+You are a Specification agent. Based on user stories, generate formal technical specifications.
 
 For each story, provide:
 - Spec ID (SPEC-XXX)
@@ -62,8 +56,8 @@ Format as:
 ### API Contracts
 ```
 POST /api/endpoint
-Request: {{ "field": "type" }}
-Response: {{ "field": "type" }}
+Request: { "field": "type" }
+Response: { "field": "type" }
 ```
 
 ### Data Models
@@ -93,15 +87,42 @@ class Model:
 
 [Continue for all specs]
 """
+    
+    async def execute(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Generate formal specifications from user stories.
+        
+        Args:
+            input_data: Contains 'stories', optional 'feedback', 'regeneration_count', 'use_cache' keys
+            
+        Returns:
+            Generated specifications with API contracts and data models
+        """
+        try:
+            stories = input_data.get("stories", "")
+            feedback = input_data.get("feedback", "")
+            regeneration_count = input_data.get("regeneration_count", 0)
+            use_cache = input_data.get("use_cache", True)
+            
+            feedback_section = ""
+            if feedback:
+                feedback_section = _FEEDBACK_TEMPLATE.substitute(feedback=feedback)
+            
+            prompt = _SPEC_TEMPLATE.substitute(
+                stories=truncate_tokens(stories, self.STORIES_TOKEN_LIMIT),
+                feedback_section=feedback_section
+            )
+            
+            # Regenerations must produce a fresh completion
+            spec_content = await self.cached_invoke(prompt, use_cache=use_cache and not regeneration_count)
             
-            response = await self.llm.ainvoke(prompt)
-            spec_content = response.content
+            markers = [match.group(0) for match in _METRICS_RE.finditer(spec_content)]
             
             metadata = {
-                "spec_count": spec_content.count("## Specification"),
-                "has_api_contracts": "API Contracts" in spec_content,
-                "has_data_models": "Data Models" in spec_content,
-                "has_test_cases": "Test Cases" in spec_content,
+                "spec_count": markers.count("## Specification"),
+                "has_api_contracts": "API Contracts" in markers,
+                "has_data_models": "Data Models" in markers,
+                "has_test_cases": "Test Cases" in markers,
                 "regeneration_count": regeneration_count
             }
             
@@ -1,46 +1,50 @@
 """
 Story Agent - Generates user stories from epics.
 """
-from typing import Dict, Any
-from app.agents.base import BaseAgent
+import asyncio
+import re
+import string
+from typing import Dict, Any, List
+from app.agents.base import BaseAgent, truncate_tokens
 
+# Request-specific part of the prompt; the static instructions live in SYSTEM_PROMPT
+_STORY_TEMPLATE = string.Template("""
+Epics:
+$epics
+$feedback_section
+""")
 
-class StoryAgent(BaseAgent):
-    """Agent responsible for generating user stories."""
-    
-    async def execute(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
-        """
-        Generate user stories from epics.
-        
-        Must not generate stories until epics are approved.
-        
-        Args:
-            input_data: Contains 'epics', optional 'feedback', 'regeneration_count' keys
-            
-        Returns:
-            Generated user stories with acceptance criteria
-        """
-        try:
-            epics = input_data.get("epics", "")
-            feedback = input_data.get("feedback", "")
-            regeneration_count = input_data.get("regeneration_count", 0)
-            
-            feedback_section = ""
-            if feedback:
-                feedback_section = f"""
+# Per-epic variant; stories are renumbered across epics once all are generated
+_EPIC_STORY_TEMPLATE = string.Template("""
+Epic:
+$epic
+$feedback_section
+""")
+
+_FEEDBACK_TEMPLATE = string.Template("""
 
 ## User Feedback from Previous Iteration
-{feedback}
+$feedback
 
 Please incorporate this feedback into the story generation.
-"""
-            
-            prompt = f"""
-You are a Story generation agent. Based on the approved epics, generate detailed user stories.
+""")
 
-Epics:
-{epics}
-{feedback_section}
+# Start of each epic section in the approved epics document
+_EPIC_HEADING_RE = re.compile(r"^### Epic EP-", re.MULTILINE)
+
+# Story headings, and any story ID referenced in the text
+_STORY_HEADING_RE = re.compile(r"^### Story (US-\d+)", re.MULTILINE)
+_STORY_ID_RE = re.compile(r"\bUS-\d+\b")
+
+
+class StoryAgent(BaseAgent):
+    """Agent responsible for generating user stories."""
+    
+    # Hard cap on the epics embedded in the prompt
+    EPICS_TOKEN_LIMIT = 6000
+    
+    SYSTEM_PROMPT = """
+You are a Story generation agent. Based on the approved epics, generate detailed user stories.
 
 For each epic, generate 3-5 user stories with:
 - Story ID (US-XXX)
@@ -81,9 +85,104 @@ Format as:
 
 [Continue for all stories]
 """
+    
+    @staticmethod
+    def _split_epics(epics: str) -> List[str]:
+        """
+        Split an epics document into one section per epic.
+        
+        Args:
+            epics: Approved epics markdown
+            
+        Returns:
+            Epic sections in document order, each prefixed with the shared
+            context before the first epic (e.g. the overview); trailing
+            content such as the dependency diagram stays with the last epic
+        """
+        starts = [match.start() for match in _EPIC_HEADING_RE.finditer(epics)]
+        preamble = epics[:starts[0]].strip() if starts else ""
+        return [
+            f"{preamble}\n\n{epics[start:end].strip()}" if preamble else epics[start:end].strip()
+            for start, end in zip(starts, starts[1:] + [len(epics)])
+        ]
+    
+    @staticmethod
+    def _renumber_stories(sections: List[str]) -> List[str]:
+        """
+        Number the stories of independently generated sections in one sequence.
+        
+        Each section numbers its own stories from US-001, so IDs are remapped
+        in heading order, along with the references to them in the section.
+        
+        Args:
+            sections: Generated stories, one section per epic, in epic order
+            
+        Returns:
+            The sections with unique, sequential story IDs
+        """
+        renumbered = []
+        next_id = 1
+        for section in sections:
+            mapping = {}
+            for story_id in _STORY_HEADING_RE.findall(section):
+                if story_id not in mapping:
+                    mapping[story_id] = f"US-{next_id:03d}"
+                    next_id += 1
+            renumbered.append(_STORY_ID_RE.sub(
+                lambda match, mapping=mapping: mapping.get(match.group(0), match.group(0)),
+                section
+            ))
+        return renumbered
+    
+    async def execute(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Generate user stories from epics.
+        
+        Must not generate stories until epics are approved.
+        
+        Args:
+            input_data: Contains 'epics', optional 'feedback', 'regeneration_count', 'use_cache' keys
+            
+        Returns:
+            Generated user stories with acceptance criteria
+        """
+        try:
+            epics = input_data.get("epics", "")
+            feedback = input_data.get("feedback", "")
+            regeneration_count = input_data.get("regeneration_count", 0)
+            use_cache = input_data.get("use_cache", True)
+            
+            feedback_section = ""
+            if feedback:
+                feedback_section = _FEEDBACK_TEMPLATE.substitute(feedback=feedback)
+            
+            # Stories for different epics are independent, so generate them
+            # concurrently and stitch them back together in epic order
+            epic_sections = self._split_epics(epics)
+            if len(epic_sections) > 1:
+                prompts = [
+                    _EPIC_STORY_TEMPLATE.substitute(
+                        epic=truncate_tokens(epic, self.EPICS_TOKEN_LIMIT),
+                        feedback_section=feedback_section
+                    )
+                    for epic in epic_sections
+                ]
+            else:
+                prompts = [
+                    _STORY_TEMPLATE.substitute(
+                        epics=truncate_tokens(epics, self.EPICS_TOKEN_LIMIT),
+                        feedback_section=feedback_section
+                    )
+                ]
             
-            response = await self.llm.ainvoke(prompt)
-            stories_content = response.content
+            # Regenerations must produce a fresh completion
+            results = await asyncio.gather(*(
+                self.cached_invoke(prompt, use_cache=use_cache and not regeneration_count)
+                for prompt in prompts
+            ))
+            if len(results) > 1:
+                results = self._renumber_stories(results)
+            stories_content = "\n\n".join(result.strip() for result in results)
             
             metadata = {
                 "story_count": stories_content.count("### Story"),
@@ -1,32 +1,35 @@
 """
 Validation Agent - Validates generated code.
 """
+import re
+import string
 from typing import Dict, Any
-from app.agents.base import BaseAgent
+from app.agents.base import BaseAgent, truncate_tokens
+
+# Request-specific part of the prompt; the static instructions live in SYSTEM_PROMPT
+_VALIDATION_TEMPLATE = string.Template("""
+Code to Validate:
+$code
+""")
+
+# Lines worth validating wherever they appear in the code
+_RISK_LINE_RE = re.compile(r"^.*\b(?:eval|exec|os\.system|subprocess|password|secret)\b.*$", re.M)
+
+# Score line as requested in SYSTEM_PROMPT, tolerating markdown bold around the label
+_SCORE_RE = re.compile(r"Overall Score:\**\s*(\d+)")
 
 
 class ValidationAgent(BaseAgent):
     """Agent responsible for validating generated code."""
     
-    async def execute(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
-        """
-        Validate generated code.
-        
-        Args:
-            input_data: Contains 'code' key
-            
-        Returns:
-            Validation report with issues and suggestions
-        """
-        try:
-            code = input_data.get("code", "")
-            
-            prompt = f"""
+    # Token budget for the code embedded in the prompt, and the part of it
+    # reserved for risky lines from the middle of the code
+    CODE_TOKEN_LIMIT = 500
+    RISK_LINES_TOKEN_LIMIT = 100
+    
+    SYSTEM_PROMPT = """
 You are a Validation agent. Analyze the generated code and provide a validation report.
 
-Code to Validate:
-{code[:2000]}
-
 Check for:
 1. Syntax errors
 2. Type inconsistencies
@@ -72,21 +75,31 @@ Format report as:
 
 ### Overall Score: X/10
 """
+    
+    async def execute(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Validate generated code.
+        
+        Args:
+            input_data: Contains 'code' key, and optionally 'use_cache'
+                (False to force a fresh completion)
+            
+        Returns:
+            Validation report with issues and suggestions
+        """
+        try:
+            code = self._select_code(input_data.get("code", ""))
+            
+            prompt = _VALIDATION_TEMPLATE.substitute(code=code)
             
-            response = await self.llm.ainvoke(prompt)
-            validation_content = response.content
+            validation_content = await self.cached_invoke(prompt, use_cache=input_data.get("use_cache", True))
             
             # Extract score if present
-            score = 0
-            if "Overall Score:" in validation_content:
-                try:
-                    score_line = [line for line in validation_content.split('\n') if 'Overall Score:' in line][0]
-                    score = int(score_line.split(':')[1].split('/')[0].strip())
-                except:
-                    score = 0
+            score_match = _SCORE_RE.search(validation_content)
+            score = int(score_match.group(1)) if score_match else 0
             
             metadata = {
-                "has_critical_issues": "Critical Issues" in validation_content and validation_content.count("1.") > 0,
+                "has_critical_issues": "Critical Issues" in validation_content and "1." in validation_content,
                 "overall_score": score
             }
             
@@ -94,3 +107,32 @@ Format report as:
             
         except Exception as e:
             return self.format_error(e)
+    
+    def _select_code(self, code: str) -> str:
+        """
+        Fit the code into the prompt budget.
+        
+        The beginning of generated code is mostly imports and boilerplate, so
+        instead of only the first tokens this keeps the head and the tail of
+        the code plus any risky lines (eval, subprocess, secrets...) from the
+        part that is cut.
+        
+        Args:
+            code: Generated code
+            
+        Returns:
+            The code, or a head + risky lines + tail excerpt if over budget
+        """
+        if truncate_tokens(code, self.CODE_TOKEN_LIMIT) == code:
+            return code
+        
+        risk_lines = truncate_tokens(
+            "\n".join(match.group(0) for match in _RISK_LINE_RE.finditer(code)),
+            self.RISK_LINES_TOKEN_LIMIT
+        )
+        window = (self.CODE_TOKEN_LIMIT - self.RISK_LINES_TOKEN_LIMIT) // 2
+        parts = [truncate_tokens(code, window)]
+        if risk_lines:
+            parts.append(risk_lines)
+        parts.append(truncate_tokens(code, window, keep_end=True))
+        return "\n...\n".join(parts)
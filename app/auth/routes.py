@@ -3,6 +3,8 @@ Authentication API routes.
 """
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from datetime import timedelta
 
@@ -29,16 +31,15 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
     - **email**: Valid email address
     - **password**: Password (will be hashed)
     """
-    # Check if user already exists
-    if db.query(User).filter(User.username == user_data.username).first():
+    # Check if user already exists (username and email in one round-trip)
+    existing = db.query(User.username, User.email).filter(
+        or_(User.username == user_data.username, User.email == user_data.email)
+    ).first()
+    if existing:
+        field = "Username" if existing.username == user_data.username else "Email"
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Username already registered"
-        )
-    if db.query(User).filter(User.email == user_data.email).first():
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Email already registered"
+            detail=f"{field} already registered"
         )
     
     # Create new user
@@ -50,7 +51,15 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
         role=UserRole.USER
     )
     db.add(db_user)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        # A concurrent registration claimed the username or email after the check
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Username or email already registered"
+        ) from None
     db.refresh(db_user)
     
     return db_user
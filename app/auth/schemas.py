@@ -1,7 +1,7 @@
 """
 Authentication Pydantic schemas.
 """
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, ConfigDict, EmailStr
 from typing import Optional
 from datetime import datetime
 
@@ -33,5 +33,4 @@ class UserResponse(BaseModel):
     role: str
     created_at: datetime
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
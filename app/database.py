@@ -1,18 +1,51 @@
 """
 Database models and session management.
 """
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, Boolean, ForeignKey, Enum, JSON
+from sqlalchemy import create_engine, event, Column, Integer, String, Text, DateTime, Boolean, ForeignKey, JSON, Index
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.orm import sessionmaker, relationship, validates, deferred
+from sqlalchemy.engine import make_url
+from sqlalchemy.types import TypeDecorator
 from datetime import datetime
 import enum
+import logging
+import time
 
 from app.config import get_settings
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Create database engine. Sync routes run in FastAPI's threadpool (40 threads),
+# so the pool is sized to keep concurrent requests from queueing on a connection.
+# SQLite (local and test overrides) keeps SQLAlchemy's default pool for its dialect.
+pool_sizing = {}
+if make_url(settings.database_url).get_backend_name() != "sqlite":
+    pool_sizing = {"pool_size": settings.db_pool_size, "max_overflow": settings.db_max_overflow}
+
+engine = create_engine(
+    settings.database_url,
+    **pool_sizing,
+    pool_pre_ping=True,
+    # Replace connections before server/proxy idle timeouts silently drop them
+    pool_recycle=settings.db_pool_recycle_seconds
+)
+
+# Surface query regressions (e.g. a lost index) in the logs
+if settings.db_slow_query_ms > 0:
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+        """Record when a statement is sent to the database."""
+        context._query_started_at = time.perf_counter()
+    
+    @event.listens_for(engine, "after_cursor_execute")
+    def _log_slow_query(conn, cursor, statement, parameters, context, executemany):
+        """Log statements exceeding the slow query threshold."""
+        elapsed_ms = (time.perf_counter() - context._query_started_at) * 1000
+        if elapsed_ms >= settings.db_slow_query_ms:
+            logger.warning("Slow query (%.0f ms): %s", elapsed_ms, statement)
+
 
-# Create database engine
-engine = create_engine(settings.database_url)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
@@ -42,6 +75,32 @@ class ArtifactType(str, enum.Enum):
     VALIDATION = "validation"
 
 
+class EnumString(TypeDecorator):
+    """
+    Stores a str enum as its value in a plain VARCHAR column.
+    
+    Unlike a native Postgres ENUM, adding a member needs no ALTER TYPE
+    migration. Values are checked against the enum in Python instead, and
+    loaded back as enum members.
+    """
+    
+    impl = String
+    cache_ok = True
+    
+    def __init__(self, enum_class: type, length: int = 16):
+        """Initialize the column type for `enum_class` values."""
+        super().__init__(length)
+        self.enum_class = enum_class
+    
+    def process_bind_param(self, value, dialect):
+        """Validate and convert an enum member or value for storage."""
+        return None if value is None else self.enum_class(value).value
+    
+    def process_result_value(self, value, dialect):
+        """Convert a stored value back to the enum member."""
+        return None if value is None else self.enum_class(value)
+
+
 class User(Base):
     """User model."""
     __tablename__ = "users"
@@ -50,11 +109,16 @@ class User(Base):
     username = Column(String, unique=True, index=True, nullable=False)
     email = Column(String, unique=True, index=True, nullable=False)
     hashed_password = Column(String, nullable=False)
-    role = Column(Enum(UserRole), default=UserRole.USER, nullable=False)
+    role = Column(EnumString(UserRole), default=UserRole.USER, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     
     # Relationships
     projects = relationship("Project", back_populates="owner", cascade="all, delete-orphan")
+    
+    @validates("role")
+    def validate_role(self, key, value):
+        """Reject unknown roles on assignment rather than at flush."""
+        return UserRole(value)
 
 
 class Project(Base):
@@ -66,7 +130,7 @@ class Project(Base):
     description = Column(Text)
     product_request = Column(Text, nullable=False)
     documents = Column(JSON)  # Store document metadata as JSON
-    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -81,8 +145,9 @@ class Run(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     project_id = Column(Integer, ForeignKey("projects.id"), nullable=False)
-    status = Column(Enum(RunStatus), default=RunStatus.PENDING, nullable=False)
+    status = Column(EnumString(RunStatus), default=RunStatus.PENDING, nullable=False)
     current_stage = Column(String, default="")
+    use_cache = Column(Boolean, default=True, nullable=False)  # LLM caches allowed for this run
     state_checkpoint = Column(JSON)  # LangGraph checkpoint data
     error_message = Column(Text)
     started_at = Column(DateTime)
@@ -98,6 +163,11 @@ class Run(Base):
     project = relationship("Project", back_populates="runs")
     artifacts = relationship("Artifact", back_populates="run", cascade="all, delete-orphan")
     approvals = relationship("Approval", back_populates="run", cascade="all, delete-orphan")
+    
+    @validates("status")
+    def validate_status(self, key, value):
+        """Reject unknown statuses on assignment rather than at flush."""
+        return RunStatus(value)
 
 
 class Artifact(Base):
@@ -106,14 +176,26 @@ class Artifact(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     run_id = Column(Integer, ForeignKey("runs.id"), nullable=False)
-    artifact_type = Column(Enum(ArtifactType), nullable=False)
+    artifact_type = Column(EnumString(ArtifactType), nullable=False)
     name = Column(String, nullable=False)
-    content = Column(Text, nullable=False)
+    # Generated documents/code can be hundreds of KB; loaded only when a query
+    # asks for it with undefer(), not for cascades and relationship loads
+    content = deferred(Column(Text, nullable=False))
     artifact_metadata = Column("metadata", JSON)
     created_at = Column(DateTime, default=datetime.utcnow)
     
     # Relationships
     run = relationship("Run", back_populates="artifacts")
+    
+    @validates("artifact_type")
+    def validate_artifact_type(self, key, value):
+        """Reject unknown artifact types on assignment rather than at flush."""
+        return ArtifactType(value)
+    
+    __table_args__ = (
+        # Stage artifacts are looked up by run and type
+        Index("ix_artifacts_run_type", "run_id", "artifact_type"),
+    )
 
 
 class Approval(Base):
@@ -131,6 +213,11 @@ class Approval(Base):
     
     # Relationships
     run = relationship("Run", back_populates="approvals")
+    
+    __table_args__ = (
+        # One gate per stage of a run; also serves the (run_id, stage) lookups
+        Index("uq_approvals_run_stage", "run_id", "stage", unique=True),
+    )
 
 
 def get_db():
@@ -1,17 +1,23 @@
 """
 Main FastAPI application.
 """
+import asyncio
 from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 
+from app.agents.base import get_encoding
+from app.config import get_settings
 from app.database import init_db
 from app.auth.routes import router as auth_router
 from app.projects.routes import router as projects_router
 from app.runs.routes import router as runs_router
 from app.admin.routes import router as admin_router
 from app.utils.routes import router as export_router
+from app.observability.langfuse_integration import observability
+
+settings = get_settings()
 
 
 @asynccontextmanager
@@ -21,9 +27,14 @@ async def lifespan(app: FastAPI):
     # Only initialize DB if not in test mode (tests use SQLite)
     import os
     if os.getenv("TESTING") != "true":
-        init_db()
+        # DDL is blocking; keep it off the event loop
+        await asyncio.to_thread(init_db)
+        # Load the tokenizer now; its first use downloads and parses the BPE
+        # file, which would otherwise block the event loop mid-run
+        await asyncio.to_thread(get_encoding)
     yield
-    # Shutdown (cleanup if needed)
+    # Shutdown: send any traces still queued in the Langfuse client
+    await asyncio.to_thread(observability.flush)
 
 
 app = FastAPI(
@@ -52,16 +63,21 @@ app = FastAPI(
     6. **Get Artifacts** - Download generated code and documentation
     """,
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
-# CORS middleware
+# CORS middleware. Explicit lists let the middleware answer preflights without
+# echoing request headers back, and max_age lets browsers cache the preflight.
+# Auth uses bearer tokens, so credentials are only allowed for pinned origins.
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_origins=settings.cors_origins,
+    allow_credentials="*" not in settings.cors_origins,
+    allow_methods=["GET", "POST", "PUT", "DELETE"],
+    allow_headers=["Authorization", "Content-Type", "Last-Event-ID"],
+    expose_headers=["X-Next-After"],
+    max_age=settings.cors_max_age_seconds,
 )
 
 # Include routers
@@ -103,4 +119,6 @@ async def global_exception_handler(request: Request, exc: Exception):
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # Single worker: SSE progress, approval wakeups and the LLM caches live in
+    # this process, so extra workers would not see each other's runs
+    uvicorn.run("app.main:app", host="0.0.0.0", port=8000, loop="uvloop", http="httptools")
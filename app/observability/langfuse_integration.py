@@ -1,11 +1,13 @@
 """
 Observability integration with Langfuse.
 """
+import logging
 from typing import Optional
 from langfuse import Langfuse
 from app.config import get_settings
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
 
 
 class ObservabilityService:
@@ -35,6 +37,9 @@ class ObservabilityService:
         """
         Trace an LLM call.
         
+        Non-blocking: the Langfuse client queues the event and a background
+        thread sends it in batches.
+        
         Args:
             name: Name of the operation
             run_id: Run ID
@@ -53,7 +58,7 @@ class ObservabilityService:
             )
         except Exception as e:
             # Don't fail if observability fails
-            print(f"Observability error: {e}")
+            logger.warning("Observability error: %s", e)
     
     def flush(self):
         """Flush pending traces."""
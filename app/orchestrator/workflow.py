@@ -1,12 +1,18 @@
 """
 Orchestrator using LangGraph for multi-agent workflow.
 """
-import operator
-from typing import Annotated, Any, Dict, TypedDict
+import asyncio
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Tuple, TypedDict
 
 from langgraph.graph import END, StateGraph
-from sqlalchemy.orm import Session
+from sqlalchemy import bindparam, insert, select, update
+from sqlalchemy.orm import Session, joinedload
 
+from app import database
 from app.agents.code_agent import CodeAgent
 from app.agents.epic_agent import EpicAgent
 from app.agents.research_agent import ResearchAgent
@@ -16,6 +22,12 @@ from app.agents.validation_agent import ValidationAgent
 from app.database import Approval, Artifact, ArtifactType, Run, RunStatus
 from app.runs.progress_emitter import emit_progress
 
+# Stage marker UPDATE, built once; every stage executes it with new parameters
+_MARK_STAGE = update(Run).where(Run.id == bindparam("run_id")).values(current_stage=bindparam("stage"))
+
+# Session shared by the nodes of the run executing in the current task
+_run_session: ContextVar[Optional[Session]] = ContextVar("run_session", default=None)
+
 
 class WorkflowState(TypedDict, total=False):
     """State for the workflow graph."""
@@ -27,459 +39,422 @@ class WorkflowState(TypedDict, total=False):
     specs: str
     code: str
     validation: str
-    messages: Annotated[list, operator.add]
-    current_stage: str
     error: str
     epic_regeneration_count: int
     story_regeneration_count: int
     spec_regeneration_count: int
+    use_cache: bool
+    approvals: Dict[str, Approval]
+
+
+@dataclass(frozen=True)
+class StageSpec:
+    """How the workflow runs one agent stage."""
+    name: str  # Stage name, also the state key of its output
+    label: str  # Human-readable name for progress events
+    agent_attr: str
+    input_keys: Tuple[str, ...]
+    artifact_type: ArtifactType
+    filename: str
+    count_key: Optional[str] = None  # Regeneration counter; set for gated stages
+    mark_stage: bool = True  # Commit the stage as current while the agent runs
+
+
+STAGES: Dict[str, StageSpec] = {spec.name: spec for spec in (
+    # No stage marker: execute_run records "research" when the run starts
+    StageSpec("research", "Research phase", "research_agent", ("product_request",),
+              ArtifactType.RESEARCH, "research.md", mark_stage=False),
+    StageSpec("epics", "Epic generation", "epic_agent", ("product_request", "research"),
+              ArtifactType.EPICS, "epics.md", count_key="epic_regeneration_count"),
+    StageSpec("stories", "Story generation", "story_agent", ("epics",),
+              ArtifactType.STORIES, "stories.md", count_key="story_regeneration_count"),
+    StageSpec("specs", "Spec generation", "spec_agent", ("stories",),
+              ArtifactType.SPECS, "specs.md", count_key="spec_regeneration_count"),
+    StageSpec("code", "Code generation", "code_agent", ("specs",),
+              ArtifactType.CODE, "code.md"),
+    StageSpec("validation", "Validation", "validation_agent", ("code",),
+              ArtifactType.VALIDATION, "validation_report.md"),
+)}
+
+# State key holding each artifact type's content
+_ARTIFACT_STATE_KEYS: Dict[ArtifactType, str] = {spec.artifact_type: spec.name for spec in STAGES.values()}
 
 
 class Orchestrator:
     """Orchestrates the multi-agent workflow using LangGraph."""
 
-    def __init__(self):
-        """Initialize the orchestrator with agents."""
-        self.research_agent = ResearchAgent()
-        self.epic_agent = EpicAgent()
-        self.story_agent = StoryAgent()
-        self.spec_agent = SpecAgent()
-        self.code_agent = CodeAgent()
-        self.validation_agent = ValidationAgent()
+    @cached_property
+    def workflow(self):
+        """Compiled workflow graph, built once on first use."""
+        return self._build_workflow()
+
+    @cached_property
+    def research_agent(self) -> ResearchAgent:
+        """Research agent."""
+        return ResearchAgent()
+
+    @cached_property
+    def epic_agent(self) -> EpicAgent:
+        """Epic agent."""
+        return EpicAgent()
+
+    @cached_property
+    def story_agent(self) -> StoryAgent:
+        """Story agent."""
+        return StoryAgent()
+
+    @cached_property
+    def spec_agent(self) -> SpecAgent:
+        """Spec agent."""
+        return SpecAgent()
+
+    @cached_property
+    def code_agent(self) -> CodeAgent:
+        """Code agent."""
+        return CodeAgent()
+
+    @cached_property
+    def validation_agent(self) -> ValidationAgent:
+        """Validation agent."""
+        return ValidationAgent()
+
+    @staticmethod
+    def _session() -> Session:
+        """
+        Open a database session for one workflow step.
+
+        Commits do not expire loaded rows, so rows a node keeps using after
+        committing its stage marker are not reloaded with another SELECT.
+        """
+        return database.SessionLocal(expire_on_commit=False)
 
-        # Build the workflow graph
-        self.workflow = self._build_workflow()
+    @asynccontextmanager
+    async def _run_scope(self) -> AsyncIterator[Session]:
+        """
+        Open the session shared by every node of a run.
+
+        Nodes reuse it instead of checking out a session each, so the run
+        pays for one session and its Run/Approval rows stay in one identity
+        map. Each commit hands the connection back to the pool, so nothing
+        is held while agents wait on the LLM.
+        """
+        db = self._session()
+        token = _run_session.set(db)
+        try:
+            yield db
+        finally:
+            _run_session.reset(token)
+            await asyncio.to_thread(db.close)
+
+    @asynccontextmanager
+    async def _node_session(self) -> AsyncIterator[Session]:
+        """Session for a node: the run's shared session, or its own when called outside a run."""
+        db = _run_session.get()
+        if db is not None:
+            yield db
+            return
+        async with self._run_scope() as db:
+            yield db
 
     def _build_workflow(self) -> StateGraph:
         """Build the LangGraph workflow."""
         workflow = StateGraph(WorkflowState)
 
-        # Add nodes for each stage (using different names than state attributes)
+        # The graph runs a new request up to its first approval gate (the epics
+        # node opens it) and ends there rather than polling for a decision; the
+        # approval endpoint resumes the run through continue_run.
         workflow.add_node("research_phase", self._research_node)
         workflow.add_node("epics_phase", self._epics_node)
-        workflow.add_node("wait_epic_approval", self._wait_epic_approval_node)
-        workflow.add_node("stories_phase", self._stories_node)
-        workflow.add_node("wait_story_approval", self._wait_story_approval_node)
-        workflow.add_node("specs_phase", self._specs_node)
-        workflow.add_node("wait_spec_approval", self._wait_spec_approval_node)
-        workflow.add_node("code_phase", self._code_node)
-        workflow.add_node("validation_phase", self._validation_node)
-        workflow.add_node("complete", self._complete_node)
 
         # Define edges
         workflow.set_entry_point("research_phase")
         workflow.add_edge("research_phase", "epics_phase")
-        workflow.add_edge("epics_phase", "wait_epic_approval")
-        workflow.add_conditional_edges(
-            "wait_epic_approval",
-            self._check_approval,
-            {
-                "approved": "stories_phase",
-                "rejected": "epics_phase",
-                "pending": END  # Exit workflow when waiting for approval
-            }
-        )
-        workflow.add_edge("stories_phase", "wait_story_approval")
-        workflow.add_conditional_edges(
-            "wait_story_approval",
-            self._check_approval,
-            {
-                "approved": "specs_phase",
-                "rejected": "stories_phase",
-                "pending": END  # Exit workflow when waiting for approval
-            }
-        )
-        workflow.add_edge("specs_phase", "wait_spec_approval")
-        workflow.add_conditional_edges(
-            "wait_spec_approval",
-            self._check_approval,
-            {
-                "approved": "code_phase",
-                "rejected": "specs_phase",
-                "pending": END  # Exit workflow when waiting for approval
-            }
-        )
-        workflow.add_edge("code_phase", "validation_phase")
-        workflow.add_edge("validation_phase", "complete")
-        workflow.add_edge("complete", END)
+        workflow.add_edge("epics_phase", END)
 
         return workflow.compile()
 
-    async def _research_node(self, state: WorkflowState) -> WorkflowState:
-        """Execute research phase."""
-        from app.database import SessionLocal
-        db = SessionLocal()
-        try:
-            run_id = state["run_id"]
+    async def _run_stage(self, spec: StageSpec, state: WorkflowState, **extra_input: Any) -> WorkflowState:
+        """
+        Execute one pipeline stage as described by its spec.
 
-            # Emit start event
-            emit_progress(run_id, "research", "Research phase started")
+        Args:
+            spec: The stage's entry in STAGES
+            state: Workflow state
+            **extra_input: Additional agent input (e.g. callbacks)
 
-            # Update run stage
-            run = db.query(Run).filter(Run.id == run_id).first()
-            if run:
-                run.current_stage = "research"
-                db.commit()
+        Returns:
+            The updated state
+        """
+        async with self._node_session() as db:
+            run_id = state["run_id"]
+            agent_input = {key: state[key] for key in spec.input_keys}
+            agent_input.update(extra_input, use_cache=state.get("use_cache", True))
 
-            result = await self.research_agent.execute({
-                "product_request": state["product_request"]
-            })
-
-            if result["success"]:
-                state["research"] = result["content"]
-                state["current_stage"] = "research"
-
-                # Save artifact
-                self._save_artifact(
-                    db, state["run_id"],
-                    ArtifactType.RESEARCH,
-                    "research.md",
-                    result["content"],
-                    artifact_metadata=result.get("metadata")
+            approval = None
+            if spec.count_key:
+                approval, feedback, regeneration_count = await self._start_gated_stage(
+                    db, state, spec.name, spec.label, spec.count_key
                 )
-
-                # Emit completion event
-                emit_progress(run_id, "research", "Research phase completed")
+                agent_input.update(feedback=feedback, regeneration_count=regeneration_count)
             else:
-                state["error"] = result.get("error", "Research failed")
-                emit_progress(run_id, "research", f"Research phase failed: {state['error']}")
+                emit_progress(run_id, spec.name, f"{spec.label} started")
 
-            return state
-        finally:
-            db.close()
-
-    async def _epics_node(self, state: WorkflowState) -> WorkflowState:
-        """Execute epic generation phase."""
-        from app.database import SessionLocal
-        db = SessionLocal()
-        try:
-            run_id = state["run_id"]
-
-            # Check if we need to incorporate feedback from rejection
-            feedback = ""
-            approval = db.query(Approval).filter(
-                Approval.run_id == state["run_id"],
-                Approval.stage == "epics"
-            ).first()
-
-            if approval and approval.action == "regenerate" and approval.feedback:
-                feedback = approval.feedback
-                # Increment regeneration count
-                regeneration_count = state.get("epic_regeneration_count", 0) + 1
-                state["epic_regeneration_count"] = regeneration_count
-                emit_progress(run_id, "epics", f"Regenerating epics with feedback (attempt {regeneration_count})")
+            agent_call = getattr(self, spec.agent_attr).execute(agent_input)
+            if spec.mark_stage:
+                # The stage marker is committed while the agent runs
+                result = await self._execute_marking_stage(db, run_id, spec.name, agent_call)
             else:
-                regeneration_count = 0
-                emit_progress(run_id, "epics", "Epic generation started")
-
-            # Update run stage
-            run = db.query(Run).filter(Run.id == run_id).first()
-            if run:
-                run.current_stage = "epics"
-                db.commit()
+                result = await agent_call
 
-            result = await self.epic_agent.execute({
-                "product_request": state["product_request"],
-                "research": state["research"],
-                "feedback": feedback,
-                "regeneration_count": regeneration_count
-            })
-
-            if result["success"]:
-                state["epics"] = result["content"]
-                state["current_stage"] = "epics"
-
-                # Save artifact
-                self._save_artifact(
-                    db, state["run_id"],
-                    ArtifactType.EPICS,
-                    "epics.md",
-                    result["content"],
-                    artifact_metadata=result.get("metadata")
-                )
-
-                # Create or update approval gate
-                self._create_or_update_approval(db, state["run_id"], "epics")
+            return await self._finish_stage(
+                db, state, spec.name, spec.label, result, spec.artifact_type, spec.filename,
+                gated=bool(spec.count_key), approval=approval
+            )
 
-                # Emit completion event
-                emit_progress(run_id, "epics", "Epic generation completed")
-            else:
-                state["error"] = result.get("error", "Epic generation failed")
-                emit_progress(run_id, "epics", f"Epic generation failed: {state['error']}")
+    async def _research_node(self, state: WorkflowState) -> WorkflowState:
+        """Execute research phase."""
+        return await self._run_stage(STAGES["research"], state)
 
-            return state
-        finally:
-            db.close()
+    async def _epics_node(self, state: WorkflowState) -> WorkflowState:
+        """Execute epic generation phase."""
+        return await self._run_stage(STAGES["epics"], state)
 
     async def _stories_node(self, state: WorkflowState) -> WorkflowState:
         """Execute story generation phase."""
-        from app.database import SessionLocal
-        db = SessionLocal()
-        try:
-            run_id = state["run_id"]
-
-            # Check if we need to incorporate feedback from rejection
-            feedback = ""
-            approval = db.query(Approval).filter(
-                Approval.run_id == state["run_id"],
-                Approval.stage == "stories"
-            ).first()
-
-            if approval and approval.action == "regenerate" and approval.feedback:
-                feedback = approval.feedback
-                regeneration_count = state.get("story_regeneration_count", 0) + 1
-                state["story_regeneration_count"] = regeneration_count
-                emit_progress(run_id, "stories", f"Regenerating stories with feedback (attempt {regeneration_count})")
-            else:
-                regeneration_count = 0
-                emit_progress(run_id, "stories", "Story generation started")
-
-            # Update run stage
-            run = db.query(Run).filter(Run.id == run_id).first()
-            if run:
-                run.current_stage = "stories"
-                db.commit()
-
-            result = await self.story_agent.execute({
-                "epics": state["epics"],
-                "feedback": feedback,
-                "regeneration_count": regeneration_count
-            })
-
-            if result["success"]:
-                state["stories"] = result["content"]
-                state["current_stage"] = "stories"
-
-                # Save artifact
-                self._save_artifact(
-                    db, state["run_id"],
-                    ArtifactType.STORIES,
-                    "stories.md",
-                    result["content"],
-                    artifact_metadata=result.get("metadata")
-                )
-
-                # Create or update approval gate
-                self._create_or_update_approval(db, state["run_id"], "stories")
-
-                # Emit completion event
-                emit_progress(run_id, "stories", "Story generation completed")
-            else:
-                state["error"] = result.get("error", "Story generation failed")
-                emit_progress(run_id, "stories", f"Story generation failed: {state['error']}")
-
-            return state
-        finally:
-            db.close()
+        return await self._run_stage(STAGES["stories"], state)
 
     async def _specs_node(self, state: WorkflowState) -> WorkflowState:
         """Execute spec generation phase."""
-        from app.database import SessionLocal
-        db = SessionLocal()
-        try:
-            run_id = state["run_id"]
+        return await self._run_stage(STAGES["specs"], state)
 
-            # Check if we need to incorporate feedback from rejection
-            feedback = ""
-            approval = db.query(Approval).filter(
-                Approval.run_id == state["run_id"],
-                Approval.stage == "specs"
-            ).first()
-
-            if approval and approval.action == "regenerate" and approval.feedback:
-                feedback = approval.feedback
-                regeneration_count = state.get("spec_regeneration_count", 0) + 1
-                state["spec_regeneration_count"] = regeneration_count
-                emit_progress(run_id, "specs", f"Regenerating specs with feedback (attempt {regeneration_count})")
-            else:
-                regeneration_count = 0
-                emit_progress(run_id, "specs", "Spec generation started")
+    async def _code_node(self, state: WorkflowState) -> WorkflowState:
+        """Execute code generation phase, reporting each file as it streams in."""
+        run_id = state["run_id"]
+        return await self._run_stage(
+            STAGES["code"], state,
+            on_file=lambda path: emit_progress(run_id, "code", f"Generating {path}")
+        )
 
-            # Update run stage
-            run = db.query(Run).filter(Run.id == run_id).first()
-            if run:
-                run.current_stage = "specs"
-                db.commit()
+    async def _validation_node(self, state: WorkflowState) -> WorkflowState:
+        """Execute validation phase."""
+        return await self._run_stage(STAGES["validation"], state)
 
-            result = await self.spec_agent.execute({
-                "stories": state["stories"],
-                "feedback": feedback,
-                "regeneration_count": regeneration_count
-            })
-
-            if result["success"]:
-                state["specs"] = result["content"]
-                state["current_stage"] = "specs"
-
-                # Save artifact
-                self._save_artifact(
-                    db, state["run_id"],
-                    ArtifactType.SPECS,
-                    "specs.md",
-                    result["content"],
-                    artifact_metadata=result.get("metadata")
-                )
+    async def _complete_node(self, state: WorkflowState) -> WorkflowState:
+        """Complete the workflow."""
+        run_id = state["run_id"]
 
-                # Create or update approval gate
-                self._create_or_update_approval(db, state["run_id"], "specs")
+        # Update run status
+        await asyncio.to_thread(
+            self._update_run, run_id, status=RunStatus.COMPLETED, current_stage="completed"
+        )
 
-                # Emit completion event
-                emit_progress(run_id, "specs", "Spec generation completed")
-            else:
-                state["error"] = result.get("error", "Spec generation failed")
-                emit_progress(run_id, "specs", f"Spec generation failed: {state['error']}")
+        # Emit completion event
+        emit_progress(run_id, "completed", "Workflow completed successfully")
 
-            return state
-        finally:
-            db.close()
+        return state
 
-    async def _code_node(self, state: WorkflowState) -> WorkflowState:
-        """Execute code generation phase."""
-        from app.database import SessionLocal
-        db = SessionLocal()
-        try:
-            run_id = state["run_id"]
+    async def _start_gated_stage(
+        self,
+        db: Session,
+        state: WorkflowState,
+        stage: str,
+        label: str,
+        count_key: str
+    ) -> Tuple[Optional[Approval], str, int]:
+        """
+        Look up a gated stage's approval and announce the (re)generation.
 
-            emit_progress(run_id, "code", "Code generation started")
+        Args:
+            db: Session of the calling node
+            state: Workflow state; the regeneration count is incremented in it
+            stage: Gated stage ('epics', 'stories', 'specs')
+            label: Human-readable stage name for progress events
+            count_key: State key counting the stage's regenerations
+
+        Returns:
+            Tuple of (the stage's gate or None, reviewer feedback, regeneration count)
+        """
+        run_id = state["run_id"]
+        approval = await self._stage_approval(db, state, stage)
 
-            # Update run stage
-            run = db.query(Run).filter(Run.id == run_id).first()
-            if run:
-                run.current_stage = "code"
-                db.commit()
+        # Incorporate feedback from a rejection
+        if approval and approval.action == "regenerate" and approval.feedback:
+            regeneration_count = state.get(count_key, 0) + 1
+            state[count_key] = regeneration_count
+            emit_progress(run_id, stage, f"Regenerating {stage} with feedback (attempt {regeneration_count})")
+            return approval, approval.feedback, regeneration_count
 
-            result = await self.code_agent.execute({
-                "specs": state["specs"]
-            })
-
-            if result["success"]:
-                state["code"] = result["content"]
-                state["current_stage"] = "code"
-
-                # Save artifact
-                self._save_artifact(
-                    db, state["run_id"],
-                    ArtifactType.CODE,
-                    "code.md",
-                    result["content"],
-                    artifact_metadata=result.get("metadata")
-                )
+        emit_progress(run_id, stage, f"{label} started")
+        return approval, "", 0
 
-                # Emit completion event
-                emit_progress(run_id, "code", "Code generation completed")
-            else:
-                state["error"] = result.get("error", "Code generation failed")
-                emit_progress(run_id, "code", f"Code generation failed: {state['error']}")
+    async def _finish_stage(
+        self,
+        db: Session,
+        state: WorkflowState,
+        stage: str,
+        label: str,
+        result: Dict[str, Any],
+        artifact_type: ArtifactType,
+        name: str,
+        gated: bool = False,
+        approval: Optional[Approval] = None
+    ) -> WorkflowState:
+        """
+        Record a stage's agent result in the state and the database.
 
-            return state
-        finally:
-            db.close()
+        Args:
+            db: Session of the calling node
+            state: Workflow state to update
+            stage: Stage name, also the state key of its output
+            label: Human-readable stage name for progress events
+            result: Agent result
+            artifact_type: Type of the stage artifact
+            name: Artifact file name
+            gated: Whether the stage opens an approval gate
+            approval: The stage's gate as loaded by the node, if any
+
+        Returns:
+            The updated state
+        """
+        run_id = state["run_id"]
 
-    async def _validation_node(self, state: WorkflowState) -> WorkflowState:
-        """Execute validation phase."""
-        from app.database import SessionLocal
-        db = SessionLocal()
-        try:
-            run_id = state["run_id"]
+        if not result["success"]:
+            state["error"] = result.get("error", f"{label} failed")
+            emit_progress(run_id, stage, f"{label} failed: {state['error']}")
+            return state
 
-            emit_progress(run_id, "validation", "Validation started")
+        state[stage] = result["content"]
 
-            # Update run stage
-            run = db.query(Run).filter(Run.id == run_id).first()
-            if run:
-                run.current_stage = "validation"
-                db.commit()
+        # Save artifact (and open or reset the approval gate) in one transaction
+        gate = await asyncio.to_thread(
+            self._persist_stage, db, run_id, artifact_type, name, result,
+            stage if gated else None, approval
+        )
+        if gated:
+            self._remember_approval(state, stage, gate)
 
-            result = await self.validation_agent.execute({
-                "code": state["code"]
-            })
-
-            if result["success"]:
-                state["validation"] = result["content"]
-                state["current_stage"] = "validation"
-
-                # Save artifact
-                self._save_artifact(
-                    db, state["run_id"],
-                    ArtifactType.VALIDATION,
-                    "validation_report.md",
-                    result["content"],
-                    artifact_metadata=result.get("metadata")
-                )
+        emit_progress(run_id, stage, f"{label} completed")
+        return state
 
-                # Emit completion event
-                emit_progress(run_id, "validation", "Validation completed")
-            else:
-                state["error"] = result.get("error", "Validation failed")
-                emit_progress(run_id, "validation", f"Validation failed: {state['error']}")
+    async def _execute_marking_stage(
+        self,
+        db: Session,
+        run_id: int,
+        stage: str,
+        agent_call: Awaitable[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """
+        Run an agent call while the run's stage is updated in a worker thread.
 
-            return state
-        finally:
-            db.close()
+        The stage is committed right away so status polls see it during the
+        LLM call, without blocking the event loop on the database roundtrip.
+        The session is only used by the worker thread until the marker is
+        committed. If the marker fails, the agent call is cancelled rather
+        than left running for a result nobody reads, and the session is
+        rolled back so the run can keep using it.
 
-    async def _complete_node(self, state: WorkflowState) -> WorkflowState:
-        """Complete the workflow."""
-        from app.database import SessionLocal
-        db = SessionLocal()
-        try:
-            run_id = state["run_id"]
-            state["current_stage"] = "completed"
+        Args:
+            db: Session of the calling node
+            run_id: ID of the run
+            stage: Stage to record as current
+            agent_call: Agent `execute` coroutine
 
-            # Update run status
-            run = db.query(Run).filter(Run.id == state["run_id"]).first()
-            if run:
-                run.status = RunStatus.COMPLETED
-                run.current_stage = "completed"
+        Returns:
+            The agent result
+        """
+        def mark_stage():
+            try:
+                db.execute(_MARK_STAGE, {"run_id": run_id, "stage": stage})
                 db.commit()
+            except Exception:
+                db.rollback()
+                raise
 
-            # Emit completion event
-            emit_progress(run_id, "completed", "Workflow completed successfully")
+        agent_task = asyncio.ensure_future(agent_call)
+        try:
+            await asyncio.to_thread(mark_stage)
+        except BaseException:
+            agent_task.cancel()
+            raise
+        return await agent_task
 
-            return state
+    def _set_run_fields(self, db: Session, run_id: int, **values):
+        """Update run columns by primary key without loading the run; the caller commits."""
+        db.execute(update(Run).where(Run.id == run_id).values(**values))
+
+    def _update_run(self, run_id: int, **values):
+        """Update and commit run columns in a session of their own (blocking; run in a thread)."""
+        db = self._session()
+        try:
+            self._set_run_fields(db, run_id, **values)
+            db.commit()
         finally:
             db.close()
 
-    async def _wait_epic_approval_node(self, state: WorkflowState) -> WorkflowState:
-        """Wait for epic approval."""
-        state["current_stage"] = "waiting_epic_approval"
-        return state
-
-    async def _wait_story_approval_node(self, state: WorkflowState) -> WorkflowState:
-        """Wait for story approval."""
-        state["current_stage"] = "waiting_story_approval"
-        return state
-
-    async def _wait_spec_approval_node(self, state: WorkflowState) -> WorkflowState:
-        """Wait for spec approval."""
-        state["current_stage"] = "waiting_spec_approval"
-        return state
-
-    def _check_approval(self, state: WorkflowState) -> str:
-        """Check if current stage is approved."""
-        from app.database import SessionLocal
-        db = SessionLocal()
-        try:
-            stage_map = {
-                "waiting_epic_approval": "epics",
-                "waiting_story_approval": "stories",
-                "waiting_spec_approval": "specs"
-            }
+    def _get_approval(self, db: Session, run_id: int, stage: str) -> Optional[Approval]:
+        """Load the approval gate of a run stage, if it exists (blocking; run in a thread)."""
+        return db.query(Approval).filter(
+            Approval.run_id == run_id,
+            Approval.stage == stage
+        ).first()
 
-            stage = stage_map.get(state["current_stage"])
-            if not stage:
-                return "pending"
+    async def _stage_approval(self, db: Session, state: WorkflowState, stage: str) -> Optional[Approval]:
+        """Get a stage's approval gate from the run's prefetched gates, querying only without them."""
+        if state.get("approvals") is not None:
+            return state["approvals"].get(stage)
+        return await asyncio.to_thread(self._get_approval, db, state["run_id"], stage)
+
+    def _remember_approval(self, state: WorkflowState, stage: str, approval: Approval):
+        """Keep the run's prefetched gates current after a node opens or resets one."""
+        if state.get("approvals") is not None:
+            state["approvals"][stage] = approval
+
+    def _load_approvals(self, db: Session, run_id: int) -> Dict[str, Approval]:
+        """Load all approval gates of a run in one query, by stage (blocking; run in a thread)."""
+        return {
+            approval.stage: approval
+            for approval in db.query(Approval).filter(Approval.run_id == run_id)
+        }
 
-            approval = db.query(Approval).filter(
-                Approval.run_id == state["run_id"],
-                Approval.stage == stage
-            ).first()
+    def _persist_stage(
+        self,
+        db: Session,
+        run_id: int,
+        artifact_type: ArtifactType,
+        name: str,
+        result: Dict[str, Any],
+        approval_stage: Optional[str] = None,
+        approval: Optional[Approval] = None
+    ) -> Optional[Approval]:
+        """
+        Commit a stage's artifact and, for gated stages, its approval gate.
 
-            if not approval or approval.approved is None:
-                return "pending"
+        Blocking; nodes run it in a worker thread so the commit does not stall
+        other runs on the event loop.
 
-            return "approved" if approval.approved else "rejected"
-        finally:
-            db.close()
+        Args:
+            db: Session of the calling node
+            run_id: ID of the run
+            artifact_type: Type of the stage artifact
+            name: Artifact file name
+            result: Successful agent result
+            approval_stage: Stage to open (or reset) an approval gate for
+            approval: The stage's gate as loaded by the node, if any
+
+        Returns:
+            The stage's (new or reset) approval gate, or None for ungated stages
+        """
+        self._save_artifact(
+            db, run_id,
+            artifact_type,
+            name,
+            result["content"],
+            artifact_metadata=result.get("metadata")
+        )
+        if approval_stage:
+            approval = self._create_or_update_approval(db, run_id, approval_stage, approval)
+        db.commit()
+        return approval if approval_stage else None
 
     def _save_artifact(
         self,
@@ -490,41 +465,37 @@ class Orchestrator:
         content: str,
         artifact_metadata: Dict[str, Any] = None
     ):
-        """Save an artifact to the database."""
-        artifact = Artifact(
+        """
+        Insert an artifact in the node's transaction; the calling node commits.
+
+        Uses a Core INSERT: nodes never read the row back, so building and
+        tracking an ORM instance for the (possibly large) content is wasted.
+        """
+        db.execute(insert(Artifact).values(
             run_id=run_id,
             artifact_type=artifact_type,
             name=name,
             content=content,
             artifact_metadata=artifact_metadata
-        )
-        db.add(artifact)
-        db.commit()
-
-    def _create_approval(self, db: Session, run_id: int, stage: str):
-        """Create an approval gate."""
-        # Check if already exists
-        existing = db.query(Approval).filter(
-            Approval.run_id == run_id,
-            Approval.stage == stage
-        ).first()
+        ))
 
-        if not existing:
-            approval = Approval(
-                run_id=run_id,
-                stage=stage,
-                approved=None
-            )
-            db.add(approval)
-            db.commit()
-
-    def _create_or_update_approval(self, db: Session, run_id: int, stage: str):
-        """Create or reset an approval gate for regeneration."""
-        approval = db.query(Approval).filter(
-            Approval.run_id == run_id,
-            Approval.stage == stage
-        ).first()
+    def _create_or_update_approval(
+        self,
+        db: Session,
+        run_id: int,
+        stage: str,
+        approval: Optional[Approval] = None
+    ) -> Approval:
+        """
+        Create or reset an approval gate for regeneration; the calling node commits.
 
+        Args:
+            db: Session of the calling node
+            run_id: ID of the run
+            stage: Gated stage ('epics', 'stories', 'specs')
+            approval: The stage's gate as already loaded by the node for its
+                feedback, or None if the run has no gate for the stage yet
+        """
         if approval:
             # Reset approval status for regenerated content
             approval.approved = None
@@ -538,152 +509,165 @@ class Orchestrator:
             )
             db.add(approval)
 
+        return approval
+
+    def _load_continuation(
+        self, db: Session, run_id: int, from_stage: str, use_cache: Optional[bool]
+    ) -> Tuple[WorkflowState, bool, bool]:
+        """
+        Rebuild a run's state from its artifacts and mark it running.
+
+        Blocking; continue_run runs it in a worker thread.
+
+        Args:
+            db: Session of the run
+            run_id: ID of the run to continue
+            from_stage: Stage whose approval triggered the continuation
+            use_cache: Whether agents may reuse cached LLM responses; None
+                keeps the choice the run was started with
+
+        Returns:
+            Tuple of (workflow state, regenerate requested, stage approved)
+        """
+        run = db.get(Run, run_id, options=[joinedload(Run.project)])
+        if not run:
+            raise ValueError(f"Run {run_id} not found")
+
+        # Get artifacts to reconstruct state, as plain rows of the columns used
+        artifacts = db.execute(
+            select(Artifact.id, Artifact.artifact_type, Artifact.content)
+            .where(Artifact.run_id == run_id)
+            .order_by(Artifact.id)
+        ).all()
+
+        # Build state from artifacts
+        state: WorkflowState = {
+            "run_id": run_id,
+            "product_request": run.project.product_request,
+            "research": "",
+            "epics": "",
+            "stories": "",
+            "specs": "",
+            "code": "",
+            "validation": "",
+            "error": "",
+            "epic_regeneration_count": 0,
+            "story_regeneration_count": 0,
+            "spec_regeneration_count": 0,
+            "use_cache": run.use_cache if use_cache is None else use_cache
+        }
+
+        # Populate state from artifacts; in ID order, so the latest version wins
+        for artifact in artifacts:
+            state_key = _ARTIFACT_STATE_KEYS.get(artifact.artifact_type)
+            if state_key:
+                state[state_key] = artifact.content
+
+        # An output older than the stage before it predates a regeneration of
+        # that stage, so it (and everything after it) has to be produced again
+        latest_ids = {artifact.artifact_type: artifact.id for artifact in artifacts}
+        newest_id, stale = 0, False
+        for spec in STAGES.values():
+            artifact_id = latest_ids.get(spec.artifact_type, 0)
+            stale = stale or artifact_id < newest_id
+            if stale:
+                state[spec.name] = ""
+            newest_id = max(newest_id, artifact_id)
+
+        # All gates in one query; the decision that triggered this continuation
+        # is among them, and the nodes read theirs from the state
+        state["approvals"] = self._load_approvals(db, run_id)
+        approval = state["approvals"].get(from_stage)
+        regenerate = bool(approval and approval.action == "regenerate")
+        approved = bool(approval and approval.approved)
+
+        # Update run status to running
+        run.status = RunStatus.RUNNING
         db.commit()
 
-    async def continue_run(self, run_id: int, from_stage: str):
+        return state, regenerate, approved
+
+    async def _run_pending(
+        self,
+        node: Callable[[WorkflowState], Awaitable[WorkflowState]],
+        state: WorkflowState,
+        stage: str
+    ) -> WorkflowState:
+        """
+        Run a stage on resume unless its output already exists.
+
+        A repeated approval, or a retry after a later stage failed, would
+        otherwise pay for the stage's LLM call again and add a duplicate
+        artifact. Outputs made stale by an upstream regeneration were already
+        cleared from the state by _load_continuation.
+        """
+        if state.get(stage):
+            emit_progress(state["run_id"], stage, f"{STAGES[stage].label} already completed, skipping")
+            return state
+        return await node(state)
+
+    async def continue_run(self, run_id: int, from_stage: str, use_cache: Optional[bool] = None):
         """
         Continue a run from a specific stage after approval.
 
         Args:
             run_id: ID of the run to continue
             from_stage: Stage to continue from ('epics', 'stories', 'specs')
+            use_cache: Set to False to force fresh LLM completions for the stages
+                run; by default the run keeps the setting it was started with
         """
-        from app.database import SessionLocal
-
-        # Get current run state from database
-        db = SessionLocal()
-        try:
-            run = db.query(Run).filter(Run.id == run_id).first()
-            if not run:
-                raise ValueError(f"Run {run_id} not found")
-
-            # Get artifacts to reconstruct state
-            artifacts = db.query(Artifact).filter(Artifact.run_id == run_id).all()
-
-            # Build state from artifacts
-            state: WorkflowState = {
-                "run_id": run_id,
-                "product_request": run.project.product_request,
-                "research": "",
-                "epics": "",
-                "stories": "",
-                "specs": "",
-                "code": "",
-                "validation": "",
-                "messages": [],
-                "current_stage": from_stage,
-                "error": "",
-                "epic_regeneration_count": 0,
-                "story_regeneration_count": 0,
-                "spec_regeneration_count": 0
-            }
-
-            # Populate state from artifacts
-            for artifact in artifacts:
-                if artifact.artifact_type == ArtifactType.RESEARCH:
-                    state["research"] = artifact.content
-                elif artifact.artifact_type == ArtifactType.EPICS:
-                    state["epics"] = artifact.content
-                elif artifact.artifact_type == ArtifactType.STORIES:
-                    state["stories"] = artifact.content
-                elif artifact.artifact_type == ArtifactType.SPECS:
-                    state["specs"] = artifact.content
-                elif artifact.artifact_type == ArtifactType.CODE:
-                    state["code"] = artifact.content
-                elif artifact.artifact_type == ArtifactType.VALIDATION:
-                    state["validation"] = artifact.content
-
-            # Update run status to running
-            run.status = RunStatus.RUNNING
-            db.commit()
-        finally:
-            db.close()
+        async with self._run_scope() as db:
+            state, regenerate, approved = await asyncio.to_thread(
+                self._load_continuation, db, run_id, from_stage, use_cache
+            )
 
-        try:
-            # Continue execution based on stage
-            if from_stage == "epics":
-                # Check if we need to regenerate or continue to stories
-                db = SessionLocal()
-                try:
-                    approval = db.query(Approval).filter(
-                        Approval.run_id == run_id,
-                        Approval.stage == "epics"
-                    ).first()
-
-                    if approval and approval.action == "regenerate":
-                        # Re-run epics node
+            try:
+                # Continue execution based on stage
+                if from_stage == "epics":
+                    if regenerate:
+                        # Re-run epics node, then wait for approval again
                         state = await self._epics_node(state)
-                        # Then wait for approval again
-                    elif approval and approval.approved:
-                        # Continue to stories
-                        state = await self._stories_node(state)
-                        # Then wait for story approval
-                finally:
-                    db.close()
-
-            elif from_stage == "stories":
-                # Check if we need to regenerate or continue to specs
-                db = SessionLocal()
-                try:
-                    approval = db.query(Approval).filter(
-                        Approval.run_id == run_id,
-                        Approval.stage == "stories"
-                    ).first()
-
-                    if approval and approval.action == "regenerate":
+                    elif approved:
+                        # Continue to stories, then wait for story approval
+                        state = await self._run_pending(self._stories_node, state, "stories")
+
+                elif from_stage == "stories":
+                    if regenerate:
                         # Re-run stories node
                         state = await self._stories_node(state)
-                    elif approval and approval.approved:
+                    elif approved:
                         # Continue to specs
-                        state = await self._specs_node(state)
-                finally:
-                    db.close()
-
-            elif from_stage == "specs":
-                # Check if we need to regenerate or continue to code
-                db = SessionLocal()
-                try:
-                    approval = db.query(Approval).filter(
-                        Approval.run_id == run_id,
-                        Approval.stage == "specs"
-                    ).first()
-
-                    if approval and approval.action == "regenerate":
+                        state = await self._run_pending(self._specs_node, state, "specs")
+
+                elif from_stage == "specs":
+                    if regenerate:
                         # Re-run specs node
                         state = await self._specs_node(state)
-                    elif approval and approval.approved:
+                    elif approved:
                         # Continue to code and validation
-                        state = await self._code_node(state)
-                        state = await self._validation_node(state)
+                        state = await self._run_pending(self._code_node, state, "code")
+                        state = await self._run_pending(self._validation_node, state, "validation")
                         state = await self._complete_node(state)
-                finally:
-                    db.close()
 
-            return state
+                return state
 
-        except Exception as e:
-            # Update error status
-            db = SessionLocal()
-            try:
-                run = db.query(Run).filter(Run.id == run_id).first()
-                if run:
-                    run.status = RunStatus.FAILED
-                    run.error_message = str(e)
-                    db.commit()
-            finally:
-                db.close()
-            raise
+            except Exception as e:
+                # Update error status
+                await asyncio.to_thread(
+                    self._update_run, run_id, status=RunStatus.FAILED, error_message=str(e)
+                )
+                raise
 
-    async def execute_run(self, run_id: int, product_request: str):
+    async def execute_run(self, run_id: int, product_request: str, use_cache: bool = True):
         """
         Execute a complete run through the workflow.
 
         Args:
             run_id: ID of the run to execute
             product_request: Product request text
+            use_cache: Set to False to bypass the LLM response caches, e.g. to
+                get fresh output for a request that was run before
         """
-        from app.database import SessionLocal
-
         initial_state: WorkflowState = {
             "run_id": run_id,
             "product_request": product_request,
@@ -693,54 +677,38 @@ class Orchestrator:
             "specs": "",
             "code": "",
             "validation": "",
-            "messages": [],
-            "current_stage": "initialized",
             "error": "",
             "epic_regeneration_count": 0,
             "story_regeneration_count": 0,
-            "spec_regeneration_count": 0
+            "spec_regeneration_count": 0,
+            "use_cache": use_cache,
+            # A new run has no approval gates yet
+            "approvals": {}
         }
 
         # Update run status
-        db = SessionLocal()
-        try:
-            run = db.query(Run).filter(Run.id == run_id).first()
-            if run:
-                run.status = RunStatus.RUNNING
-                run.current_stage = "research"
-                db.commit()
-        finally:
-            db.close()
+        await asyncio.to_thread(
+            self._update_run, run_id,
+            status=RunStatus.RUNNING, current_stage="research", use_cache=use_cache
+        )
 
         try:
-            # Execute workflow
-            final_state = await self.workflow.ainvoke(initial_state)
+            # Execute workflow, its nodes sharing one session
+            async with self._run_scope():
+                final_state = await self.workflow.ainvoke(initial_state)
 
             # Update final status
-            db = SessionLocal()
-            try:
-                run = db.query(Run).filter(Run.id == run_id).first()
-                if run:
-                    if final_state.get("error"):
-                        run.status = RunStatus.FAILED
-                        run.error_message = final_state["error"]
-                    else:
-                        run.status = RunStatus.COMPLETED
-                    db.commit()
-            finally:
-                db.close()
+            if final_state.get("error"):
+                final_values = {"status": RunStatus.FAILED, "error_message": final_state["error"]}
+            else:
+                final_values = {"status": RunStatus.COMPLETED}
+            await asyncio.to_thread(self._update_run, run_id, **final_values)
 
             return final_state
 
         except Exception as e:
             # Update error status
-            db = SessionLocal()
-            try:
-                run = db.query(Run).filter(Run.id == run_id).first()
-                if run:
-                    run.status = RunStatus.FAILED
-                    run.error_message = str(e)
-                    db.commit()
-            finally:
-                db.close()
+            await asyncio.to_thread(
+                self._update_run, run_id, status=RunStatus.FAILED, error_message=str(e)
+            )
             raise
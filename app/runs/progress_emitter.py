@@ -1,12 +1,16 @@
 """
 Progress emitter for SSE events.
 """
+import asyncio
 from datetime import datetime
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 # In-memory store for SSE connections (in production, use Redis/message queue)
 run_updates: Dict[int, list] = {}
 
+# SSE streams waiting for a run's next update, with the loop each one runs on
+_waiters: Dict[int, List[Tuple[asyncio.AbstractEventLoop, asyncio.Event]]] = {}
+
 
 def emit_progress(run_id: int, stage: str, message: str, data: Optional[Dict[str, Any]] = None):
     """
@@ -32,6 +36,25 @@ def emit_progress(run_id: int, stage: str, message: str, data: Optional[Dict[str
 
     run_updates[run_id].append(update)
 
+    # Wake waiting streams; emit_progress is also called from threadpool routes.
+    # A woken stream reads every update since its last index, so a burst of
+    # emits (e.g. one per generated file) needs only one wakeup per stream.
+    try:
+        current_loop = asyncio.get_running_loop()
+    except RuntimeError:
+        current_loop = None
+    for loop, event in _waiters.get(run_id, ()):
+        if event.is_set():
+            continue
+        if loop is current_loop:
+            event.set()
+            continue
+        try:
+            loop.call_soon_threadsafe(event.set)
+        except RuntimeError:
+            # The waiter's loop has already closed
+            pass
+
 
 def get_updates(run_id: int, from_index: int = 0) -> list:
     """
@@ -50,6 +73,38 @@ def get_updates(run_id: int, from_index: int = 0) -> list:
     return run_updates[run_id][from_index:]
 
 
+async def wait_for_updates(run_id: int, from_index: int = 0, timeout: float = 5.0) -> list:
+    """
+    Wait until a run has progress updates past `from_index`.
+
+    Streams sleep until emit_progress signals them instead of polling.
+
+    Args:
+        run_id: ID of the run
+        from_index: Index to start from
+        timeout: Seconds to wait before returning with no updates
+
+    Returns:
+        List of updates from the specified index (empty on timeout)
+    """
+    updates = get_updates(run_id, from_index)
+    if updates:
+        return updates
+
+    waiter = (asyncio.get_running_loop(), asyncio.Event())
+    _waiters.setdefault(run_id, []).append(waiter)
+    try:
+        try:
+            await asyncio.wait_for(waiter[1].wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return get_updates(run_id, from_index)
+    finally:
+        _waiters[run_id].remove(waiter)
+        if not _waiters[run_id]:
+            del _waiters[run_id]
+
+
 def clear_updates(run_id: int):
     """
     Clear progress updates for a run.
@@ -1,13 +1,13 @@
 """
 Run API routes with SSE support.
 """
-import asyncio
 import json
+import logging
 from datetime import datetime
 from typing import List
 
 from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, contains_eager, undefer
 from sse_starlette.sse import EventSourceResponse
 
 from app.auth.utils import get_current_user
@@ -22,7 +22,7 @@ from app.database import (
     get_db,
 )
 from app.orchestrator.workflow import Orchestrator
-from app.runs.progress_emitter import emit_progress, get_updates
+from app.runs.progress_emitter import emit_progress, wait_for_updates
 from app.runs.schemas import (
     ApprovalCreate,
     ApprovalResponse,
@@ -32,6 +32,8 @@ from app.runs.schemas import (
     RunStatusResponse,
 )
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/api/runs", tags=["Runs"])
 
 # Create a single orchestrator instance to be reused
@@ -150,7 +152,9 @@ def get_run_artifacts(
             detail="Run not found"
         )
 
-    artifacts = db.query(Artifact).filter(Artifact.run_id == run_id).all()
+    artifacts = db.query(Artifact).options(undefer(Artifact.content)).filter(
+        Artifact.run_id == run_id
+    ).all()
     return artifacts
 
 
@@ -177,7 +181,7 @@ def get_run_epics(
             detail="Run not found"
         )
 
-    epics = db.query(Artifact).filter(
+    epics = db.query(Artifact).options(undefer(Artifact.content)).filter(
         Artifact.run_id == run_id,
         Artifact.artifact_type == ArtifactType.EPICS
     ).all()
@@ -207,7 +211,7 @@ def get_run_stories(
             detail="Run not found"
         )
 
-    stories = db.query(Artifact).filter(
+    stories = db.query(Artifact).options(undefer(Artifact.content)).filter(
         Artifact.run_id == run_id,
         Artifact.artifact_type == ArtifactType.STORIES
     ).all()
@@ -215,16 +219,21 @@ def get_run_stories(
 
 
 @router.post("/{run_id}/start")
-async def start_run(
+def start_run(
     run_id: int,
     background_tasks: BackgroundTasks,
+    use_cache: bool = True,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
     Start execution of a run.
+
+    - **use_cache**: Set to false to generate fresh output instead of reusing
+      cached LLM responses for an identical or similar request
     """
-    run = db.query(Run).join(Project).filter(
+    # The join already fetches the project; populate run.project from it
+    run = db.query(Run).join(Project).options(contains_eager(Run.project)).filter(
         Run.id == run_id,
         Project.owner_id == current_user.id
     ).first()
@@ -257,25 +266,25 @@ async def start_run(
     product_request = run.project.product_request
 
     # Trigger async orchestrator workflow in background
-    background_tasks.add_task(execute_workflow_task, run_id, product_request)
+    background_tasks.add_task(execute_workflow_task, run_id, product_request, use_cache)
 
     return {"status": "started", "run_id": run_id}
 
 
-async def execute_workflow_task(run_id: int, product_request: str):
+async def execute_workflow_task(run_id: int, product_request: str, use_cache: bool = True):
     """
     Background task to execute the orchestrator workflow.
 
     Args:
         run_id: ID of the run to execute
         product_request: Product request text
+        use_cache: Whether agents may reuse cached LLM responses
     """
     try:
-        await orchestrator.execute_run(run_id, product_request)
-    except Exception as e:
-        # Log the error (in production, use proper logging)
-        print(f"Error executing workflow for run {run_id}: {str(e)}")
-        # Error is already handled in execute_run, so we just log here
+        await orchestrator.execute_run(run_id, product_request, use_cache=use_cache)
+    except Exception:
+        # Error is already recorded on the run by execute_run, so we just log here
+        logger.exception("Error executing workflow for run %s", run_id)
 
 
 @router.post("/{run_id}/pause")
@@ -335,7 +344,7 @@ def get_approvals(
 
 
 @router.post("/{run_id}/approvals/{stage}", response_model=ApprovalResponse)
-async def submit_approval(
+def submit_approval(
     run_id: int,
     stage: str,
     approval_data: ApprovalCreate,
@@ -430,9 +439,8 @@ async def continue_workflow_task(run_id: int, stage: str):
     """
     try:
         await orchestrator.continue_run(run_id, stage)
-    except Exception as e:
-        # Log the error (in production, use proper logging)
-        print(f"Error continuing workflow for run {run_id} from stage {stage}: {str(e)}")
+    except Exception:
+        logger.exception("Error continuing workflow for run %s from stage %s", run_id, stage)
 
 
 @router.get("/{run_id}/progress")
@@ -487,8 +495,9 @@ async def get_progress_stream(
                 }
                 break
 
-            # Get new updates
-            updates = get_updates(run_id, from_index=last_index)
+            # Sleep until the orchestrator emits an update; the timeout bounds how
+            # late a status change without an update (e.g. a crash) is noticed
+            updates = await wait_for_updates(run_id, from_index=last_index)
             if updates:
                 for update in updates:
                     yield {
@@ -497,6 +506,4 @@ async def get_progress_stream(
                     }
                 last_index = last_index + len(updates)
 
-            await asyncio.sleep(1)  # Poll every second
-
     return EventSourceResponse(event_generator())
@@ -4,7 +4,7 @@ Export utilities for downloading artifacts.
 import io
 import zipfile
 from typing import List
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, undefer
 
 from app.database import Artifact, Run
 
@@ -73,7 +73,7 @@ def export_validation_report(run: Run, db: Session) -> str:
     Returns:
         Formatted validation report
     """
-    validation_artifacts = db.query(Artifact).filter(
+    validation_artifacts = db.query(Artifact).options(undefer(Artifact.content)).filter(
         Artifact.run_id == run.id,
         Artifact.artifact_type == "validation"
     ).all()
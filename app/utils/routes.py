@@ -3,7 +3,7 @@ Export API routes.
 """
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.responses import Response, FileResponse
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, undefer
 
 from app.database import get_db, Run, Project, User, Artifact
 from app.auth.utils import get_current_user
@@ -37,7 +37,9 @@ def export_artifacts_markdown(
             detail="Run not found"
         )
     
-    artifacts = db.query(Artifact).filter(Artifact.run_id == run_id).all()
+    artifacts = db.query(Artifact).options(undefer(Artifact.content)).filter(
+        Artifact.run_id == run_id
+    ).all()
     
     if not artifacts:
         raise HTTPException(
@@ -78,7 +80,7 @@ def export_code_bundle(
         )
     
     # Get code artifacts
-    artifacts = db.query(Artifact).filter(
+    artifacts = db.query(Artifact).options(undefer(Artifact.content)).filter(
         Artifact.run_id == run_id,
         Artifact.artifact_type.in_(["code", "specs"])
     ).all()
@@ -0,0 +1,7 @@
+-- Migration: Covering index for admin user listing
+-- Date: 2026-10-15
+-- Description: Lets keyset-paginated admin user listing (WHERE id > :after_id ORDER BY id)
+-- be served by an index-only scan
+
+-- Covering index for the UserResponse columns (the primary key already orders by id)
+CREATE INDEX IF NOT EXISTS ix_users_id_covering ON users(id) INCLUDE (username, email, role, created_at);
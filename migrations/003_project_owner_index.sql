@@ -0,0 +1,6 @@
+-- Migration: Index projects by owner
+-- Date: 2026-10-15
+-- Description: Serves the per-user project listing (WHERE owner_id = :id)
+-- without scanning every project
+
+CREATE INDEX IF NOT EXISTS ix_projects_owner_id ON projects(owner_id);
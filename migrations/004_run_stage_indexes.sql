@@ -0,0 +1,19 @@
+-- Migration: Composite indexes for approval gates and stage artifacts
+-- Date: 2026-10-15
+-- Description: Enforces one approval gate per run stage and indexes artifact lookups
+-- by run and type
+
+-- Unique (run_id, stage) index; supersedes idx_approvals_stage_run from migration 001.
+-- Regenerations used to insert another gate per stage, so keep only the latest one first
+BEGIN;
+DELETE FROM approvals older
+USING approvals newer
+WHERE older.run_id = newer.run_id
+  AND older.stage = newer.stage
+  AND older.id < newer.id;
+CREATE UNIQUE INDEX IF NOT EXISTS uq_approvals_run_stage ON approvals(run_id, stage);
+COMMIT;
+DROP INDEX IF EXISTS idx_approvals_stage_run;
+
+-- Stage artifact lookups by run and type
+CREATE INDEX IF NOT EXISTS ix_artifacts_run_type ON artifacts(run_id, artifact_type);
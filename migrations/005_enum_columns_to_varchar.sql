@@ -0,0 +1,11 @@
+-- Migration: Store enum columns as VARCHAR
+-- Date: 2026-10-15
+-- Description: Replaces the native Postgres ENUM types with VARCHAR columns so new
+-- statuses, roles and artifact types need no ALTER TYPE; values are validated in Python
+
+-- SQLAlchemy's Enum type stored member names (e.g. 'RUNNING'); the app now stores values
+ALTER TABLE users ALTER COLUMN role TYPE VARCHAR(16) USING lower(role::text);
+ALTER TABLE runs ALTER COLUMN status TYPE VARCHAR(16) USING lower(status::text);
+ALTER TABLE artifacts ALTER COLUMN artifact_type TYPE VARCHAR(16) USING lower(artifact_type::text);
+
+DROP TYPE IF EXISTS userrole, runstatus, artifacttype;
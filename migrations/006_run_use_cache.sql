@@ -0,0 +1,6 @@
+-- Migration: Persist the per-run cache choice
+-- Date: 2026-10-16
+-- Description: Stores whether a run may reuse cached LLM responses, so stages resumed
+-- after an approval honor the use_cache flag the run was started with
+
+ALTER TABLE runs ADD COLUMN IF NOT EXISTS use_cache BOOLEAN NOT NULL DEFAULT TRUE;
@@ -36,6 +36,67 @@ def run_migration():
         """
         CREATE INDEX IF NOT EXISTS idx_approvals_stage_run 
         ON approvals(run_id, stage);
+        """,
+        
+        # Covering index for keyset-paginated admin user listing
+        """
+        CREATE INDEX IF NOT EXISTS ix_users_id_covering 
+        ON users(id) INCLUDE (username, email, role, created_at);
+        """,
+        
+        # Index for per-owner project listing
+        """
+        CREATE INDEX IF NOT EXISTS ix_projects_owner_id 
+        ON projects(owner_id);
+        """,
+        
+        # One approval gate per run stage (replaces idx_approvals_stage_run).
+        # Regenerations used to insert another gate per stage, so the latest
+        # one is kept first; both statements run in the same transaction
+        """
+        DELETE FROM approvals older 
+        USING approvals newer 
+        WHERE older.run_id = newer.run_id 
+          AND older.stage = newer.stage 
+          AND older.id < newer.id;
+        CREATE UNIQUE INDEX IF NOT EXISTS uq_approvals_run_stage 
+        ON approvals(run_id, stage);
+        """,
+        
+        """
+        DROP INDEX IF EXISTS idx_approvals_stage_run;
+        """,
+        
+        # Stage artifact lookups by run and type
+        """
+        CREATE INDEX IF NOT EXISTS ix_artifacts_run_type 
+        ON artifacts(run_id, artifact_type);
+        """,
+        
+        # Native ENUM columns to VARCHAR (SQLAlchemy stored member names)
+        """
+        ALTER TABLE users 
+        ALTER COLUMN role TYPE VARCHAR(16) USING lower(role::text);
+        """,
+        
+        """
+        ALTER TABLE runs 
+        ALTER COLUMN status TYPE VARCHAR(16) USING lower(status::text);
+        """,
+        
+        """
+        ALTER TABLE artifacts 
+        ALTER COLUMN artifact_type TYPE VARCHAR(16) USING lower(artifact_type::text);
+        """,
+        
+        """
+        DROP TYPE IF EXISTS userrole, runstatus, artifacttype;
+        """,
+        
+        # Per-run LLM cache choice, kept for stages resumed after approval
+        """
+        ALTER TABLE runs 
+        ADD COLUMN IF NOT EXISTS use_cache BOOLEAN NOT NULL DEFAULT TRUE;
         """
     ]
     
@@ -48,6 +109,8 @@ def run_migration():
                 conn.commit()
                 print(f"✓ Migration {i}/{len(migrations)} completed successfully")
             except Exception as e:
+                # Undo any partial work (e.g. the approval dedupe) and reset the connection
+                conn.rollback()
                 print(f"✗ Migration {i}/{len(migrations)} failed: {e}")
                 # Continue with other migrations
     
@@ -0,0 +1,46 @@
+"""
+Tests for admin endpoints.
+"""
+from app.database import Project
+
+
+def test_list_projects_keyset_pagination(client, admin_token, db, test_admin):
+    """Test paging through projects with the after_id cursor."""
+    for i in range(3):
+        db.add(Project(name=f"Project {i}", product_request="Build something", owner_id=test_admin.id))
+    db.commit()
+    headers = {"Authorization": f"Bearer {admin_token}"}
+
+    response = client.get("/api/admin/projects?limit=2", headers=headers)
+    assert response.status_code == 200
+    first_page = response.json()
+    assert [p["name"] for p in first_page] == ["Project 0", "Project 1"]
+    cursor = response.headers["X-Next-After"]
+    assert cursor == str(first_page[-1]["id"])
+
+    response = client.get(f"/api/admin/projects?limit=2&after_id={cursor}", headers=headers)
+    assert [p["name"] for p in response.json()] == ["Project 2"]
+    assert "X-Next-After" not in response.headers
+
+
+def test_delete_self_rejected(client, admin_token, test_admin):
+    """Test that an admin cannot delete their own account."""
+    response = client.delete(
+        f"/api/admin/users/{test_admin.id}",
+        headers={"Authorization": f"Bearer {admin_token}"}
+    )
+    assert response.status_code == 400
+
+
+def test_delete_project(client, admin_token, db, test_admin):
+    """Test deleting a project returns an empty 204 response."""
+    project = Project(name="Doomed", product_request="Build something", owner_id=test_admin.id)
+    db.add(project)
+    db.commit()
+
+    response = client.delete(
+        f"/api/admin/projects/{project.id}",
+        headers={"Authorization": f"Bearer {admin_token}"}
+    )
+    assert response.status_code == 204
+    assert response.content == b""
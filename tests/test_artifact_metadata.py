@@ -181,3 +181,23 @@ def test_multiple_artifacts_with_different_metadata(db, test_user):
     for artifact in all_artifacts:
         assert artifact.artifact_metadata is not None
         assert "stage" in artifact.artifact_metadata
+
+
+def test_artifact_content_loaded_only_on_request(db, test_user):
+    """Test that artifact content is deferred unless the query undefers it."""
+    from sqlalchemy import inspect
+    from sqlalchemy.orm import undefer
+
+    project = Project(name="Test Project", product_request="Build something", owner_id=test_user.id)
+    run = Run(project=project)
+    db.add(Artifact(run=run, artifact_type=ArtifactType.CODE, name="code.md", content="x" * 1000))
+    db.commit()
+    run_id = run.id
+    db.expunge_all()
+
+    artifact = db.query(Artifact).filter(Artifact.run_id == run_id).one()
+    assert "content" in inspect(artifact).unloaded
+    db.expunge_all()
+
+    artifact = db.query(Artifact).options(undefer(Artifact.content)).filter(Artifact.run_id == run_id).one()
+    assert artifact.content == "x" * 1000
@@ -36,6 +36,20 @@ def test_register_duplicate_username(client, test_user):
     assert "already registered" in response.json()["detail"].lower()
 
 
+def test_register_duplicate_email(client, test_user):
+    """Test registration with duplicate email."""
+    response = client.post(
+        "/api/auth/register",
+        json={
+            "username": "otheruser",
+            "email": "test@example.com",
+            "password": "password123"
+        }
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Email already registered"
+
+
 def test_login_success(client, test_user):
     """Test successful login."""
     response = client.post(
@@ -117,3 +131,17 @@ def test_oauth2_form_data_flow(client, test_user):
     assert response.status_code == 200
     user_data = response.json()
     assert user_data["username"] == "testuser"
+
+
+def test_cors_preflight_is_cacheable(client):
+    """Test that CORS preflight responses allow the API headers and can be cached."""
+    response = client.options(
+        "/api/auth/login",
+        headers={
+            "Origin": "https://app.example.com",
+            "Access-Control-Request-Method": "POST",
+            "Access-Control-Request-Headers": "Authorization"
+        }
+    )
+    assert response.status_code == 200
+    assert response.headers["access-control-max-age"] == "86400"
@@ -0,0 +1,259 @@
+"""
+Tests for the orchestrator workflow nodes.
+"""
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+import app.database
+from app.database import Approval, Artifact, ArtifactType, Project, Run, RunStatus
+from app.orchestrator import workflow
+from app.orchestrator.workflow import Orchestrator
+from tests.conftest import TestingSessionLocal
+
+
+@pytest.fixture
+def run(db, test_user, monkeypatch):
+    """Create a run and point the orchestrator's sessions at the test database."""
+    monkeypatch.setattr(app.database, "SessionLocal", TestingSessionLocal)
+    project = Project(name="Todo", product_request="Build a todo app", owner_id=test_user.id)
+    db.add(project)
+    db.commit()
+    run = Run(project_id=project.id, status=RunStatus.RUNNING)
+    db.add(run)
+    db.commit()
+    return run
+
+
+def success(content):
+    """Build a successful agent result."""
+    return {"agent": "TestAgent", "content": content, "metadata": {"count": 1}, "success": True}
+
+
+@pytest.mark.asyncio
+async def test_epics_node_saves_artifact_and_approval_gate(db, run):
+    """Test that the epics node stores its artifact and opens an approval gate."""
+    orchestrator = Orchestrator()
+    orchestrator.epic_agent.execute = AsyncMock(return_value=success("### Epic EP-001"))
+
+    state = await orchestrator._epics_node({
+        "run_id": run.id,
+        "product_request": "Build a todo app",
+        "research": "research"
+    })
+
+    assert state["epics"] == "### Epic EP-001"
+    artifact = db.query(Artifact).filter(Artifact.run_id == run.id).one()
+    assert artifact.artifact_type == ArtifactType.EPICS
+    assert artifact.artifact_metadata == {"count": 1}
+    approval = db.query(Approval).filter(Approval.run_id == run.id).one()
+    assert approval.stage == "epics"
+    assert approval.approved is None
+    db.refresh(run)
+    assert run.current_stage == "epics"
+
+
+@pytest.mark.asyncio
+async def test_failed_stage_saves_nothing(db, run):
+    """Test that a failed agent records the error without writing an artifact."""
+    orchestrator = Orchestrator()
+    orchestrator.code_agent.execute = AsyncMock(
+        return_value={"agent": "CodeAgent", "error": "boom", "success": False}
+    )
+
+    state = await orchestrator._code_node({"run_id": run.id, "specs": "specs"})
+
+    assert state["error"] == "boom"
+    assert db.query(Artifact).filter(Artifact.run_id == run.id).count() == 0
+
+
+@pytest.mark.asyncio
+async def test_complete_node_marks_run_completed(db, run):
+    """Test that the complete node updates the run without loading it."""
+    state = await Orchestrator()._complete_node({"run_id": run.id})
+
+    assert state["run_id"] == run.id
+    db.refresh(run)
+    assert run.status == RunStatus.COMPLETED
+    assert run.current_stage == "completed"
+
+
+@pytest.mark.asyncio
+async def test_regeneration_resets_existing_gate(db, run):
+    """Test that regenerating a stage reuses its gate and passes the feedback on."""
+    db.add(Approval(run_id=run.id, stage="specs", approved=False, action="regenerate", feedback="Add auth"))
+    db.commit()
+    orchestrator = Orchestrator()
+    orchestrator.spec_agent.execute = AsyncMock(return_value=success("specs v2"))
+
+    await orchestrator._specs_node({"run_id": run.id, "stories": "stories"})
+
+    assert orchestrator.spec_agent.execute.await_args.args[0]["feedback"] == "Add auth"
+    approval = db.query(Approval).filter(Approval.run_id == run.id).one()
+    db.refresh(approval)
+    assert approval.approved is None
+    assert approval.action == "proceed"
+    assert approval.feedback == "Add auth"
+
+
+@pytest.mark.asyncio
+async def test_workflow_stops_at_first_approval_gate(db, run):
+    """Test that the graph ends at the epics gate without checking for a decision."""
+    orchestrator = Orchestrator()
+    orchestrator.research_agent.execute = AsyncMock(return_value=success("research"))
+    orchestrator.epic_agent.execute = AsyncMock(return_value=success("epics"))
+    orchestrator.story_agent.execute = AsyncMock(return_value=success("stories"))
+
+    state = await orchestrator.workflow.ainvoke({
+        "run_id": run.id,
+        "product_request": "Build a todo app"
+    })
+
+    assert state["epics"] == "epics"
+    orchestrator.story_agent.execute.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_continue_run_after_approval_runs_next_stage(db, run):
+    """Test that an approved gate continues the run with the next stage."""
+    db.add(Artifact(run_id=run.id, artifact_type=ArtifactType.EPICS, name="epics.md", content="epics"))
+    db.add(Approval(run_id=run.id, stage="epics", approved=True, action="proceed"))
+    db.commit()
+    orchestrator = Orchestrator()
+    orchestrator.epic_agent.execute = AsyncMock(return_value=success("epics v2"))
+    orchestrator.story_agent.execute = AsyncMock(return_value=success("stories"))
+
+    state = await orchestrator.continue_run(run.id, "epics")
+
+    assert state["stories"] == "stories"
+    assert orchestrator.story_agent.execute.await_args.args[0]["epics"] == "epics"
+    orchestrator.epic_agent.execute.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_execute_run_can_bypass_llm_caches(db, run):
+    """Test that use_cache=False reaches every agent the run executes."""
+    orchestrator = Orchestrator()
+    orchestrator.research_agent.execute = AsyncMock(return_value=success("research"))
+    orchestrator.epic_agent.execute = AsyncMock(return_value=success("epics"))
+
+    await orchestrator.execute_run(run.id, "Build a todo app", use_cache=False)
+
+    assert orchestrator.research_agent.execute.await_args.args[0]["use_cache"] is False
+    assert orchestrator.epic_agent.execute.await_args.args[0]["use_cache"] is False
+
+
+@pytest.mark.asyncio
+async def test_workflow_nodes_share_one_session(db, run, monkeypatch):
+    """Test that the nodes of a run reuse the run's session instead of opening their own."""
+    orchestrator = Orchestrator()
+    orchestrator.research_agent.execute = AsyncMock(return_value=success("research"))
+    orchestrator.epic_agent.execute = AsyncMock(return_value=success("epics"))
+    opened = []
+    monkeypatch.setattr(
+        Orchestrator, "_session",
+        staticmethod(lambda: opened.append(TestingSessionLocal(expire_on_commit=False)) or opened[-1])
+    )
+
+    async with orchestrator._run_scope():
+        await orchestrator.workflow.ainvoke({"run_id": run.id, "product_request": "Build a todo app"})
+
+    assert len(opened) == 1
+
+
+@pytest.mark.asyncio
+async def test_continue_run_regenerates_with_prefetched_gate(db, run):
+    """Test that a regeneration uses the gate loaded with the run and resets it in place."""
+    db.add(Artifact(run_id=run.id, artifact_type=ArtifactType.EPICS, name="epics.md", content="epics"))
+    db.add(Approval(run_id=run.id, stage="epics", approved=False, action="regenerate", feedback="More epics"))
+    db.commit()
+    orchestrator = Orchestrator()
+    orchestrator.epic_agent.execute = AsyncMock(return_value=success("epics v2"))
+
+    state = await orchestrator.continue_run(run.id, "epics")
+
+    assert orchestrator.epic_agent.execute.await_args.args[0]["feedback"] == "More epics"
+    assert state["approvals"]["epics"].action == "proceed"
+    db.expire_all()
+    assert db.query(Approval).filter(Approval.run_id == run.id).count() == 1
+
+
+@pytest.mark.asyncio
+async def test_continue_run_skips_stage_that_already_ran(db, run):
+    """Test that a repeated approval does not regenerate the next stage's existing output."""
+    for artifact_type, content in ((ArtifactType.EPICS, "epics"), (ArtifactType.STORIES, "stories")):
+        db.add(Artifact(run_id=run.id, artifact_type=artifact_type, name="a.md", content=content))
+        db.commit()
+    db.add(Approval(run_id=run.id, stage="epics", approved=True, action="proceed"))
+    db.commit()
+    orchestrator = Orchestrator()
+    orchestrator.story_agent.execute = AsyncMock(return_value=success("stories v2"))
+
+    state = await orchestrator.continue_run(run.id, "epics")
+
+    assert state["stories"] == "stories"
+    orchestrator.story_agent.execute.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_continue_run_reruns_stage_older_than_its_input(db, run):
+    """Test that output predating an upstream regeneration is produced again."""
+    for artifact_type, content in (
+        (ArtifactType.EPICS, "epics"), (ArtifactType.STORIES, "stories"), (ArtifactType.EPICS, "epics v2")
+    ):
+        db.add(Artifact(run_id=run.id, artifact_type=artifact_type, name="a.md", content=content))
+        db.commit()
+    db.add(Approval(run_id=run.id, stage="epics", approved=True, action="proceed"))
+    db.commit()
+    orchestrator = Orchestrator()
+    orchestrator.story_agent.execute = AsyncMock(return_value=success("stories v2"))
+
+    state = await orchestrator.continue_run(run.id, "epics")
+
+    assert state["stories"] == "stories v2"
+    assert orchestrator.story_agent.execute.await_args.args[0]["epics"] == "epics v2"
+
+
+@pytest.mark.asyncio
+async def test_approval_resume_keeps_run_cache_choice(db, run):
+    """Test that stages resumed after approval still bypass the caches for a use_cache=False run."""
+    orchestrator = Orchestrator()
+    orchestrator.research_agent.execute = AsyncMock(return_value=success("research"))
+    orchestrator.epic_agent.execute = AsyncMock(return_value=success("epics"))
+    orchestrator.story_agent.execute = AsyncMock(return_value=success("stories"))
+
+    await orchestrator.execute_run(run.id, "Build a todo app", use_cache=False)
+    db.query(Approval).filter(Approval.run_id == run.id).update({"approved": True})
+    db.commit()
+    await orchestrator.continue_run(run.id, "epics")
+
+    assert orchestrator.story_agent.execute.await_args.args[0]["use_cache"] is False
+
+
+
+@pytest.mark.asyncio
+async def test_failed_stage_marker_cancels_agent_call(db, run, monkeypatch):
+    """Test that a failing stage marker cancels the agent call and rolls the session back."""
+    monkeypatch.setattr(workflow, "_MARK_STAGE", text("UPDATE missing_table SET stage = :stage"))
+    cancelled = asyncio.Event()
+
+    async def agent_call():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    session = TestingSessionLocal()
+    try:
+        with pytest.raises(OperationalError):
+            await Orchestrator()._execute_marking_stage(session, run.id, "epics", agent_call())
+        await asyncio.sleep(0)
+
+        assert cancelled.is_set()
+        assert session.get(Run, run.id).id == run.id
+    finally:
+        session.close()
@@ -0,0 +1,44 @@
+"""
+Tests for SSE progress notifications.
+"""
+import asyncio
+
+import pytest
+
+from app.runs.progress_emitter import clear_updates, emit_progress, wait_for_updates
+
+
+@pytest.mark.asyncio
+async def test_waiter_wakes_on_update_from_another_thread():
+    """Test that a waiting stream is woken by an update emitted from a worker thread."""
+    waiter = asyncio.ensure_future(wait_for_updates(9001, timeout=5))
+    await asyncio.sleep(0)
+
+    await asyncio.to_thread(emit_progress, 9001, "epics", "Epic generation started")
+    updates = await asyncio.wait_for(waiter, timeout=1)
+
+    assert [update["message"] for update in updates] == ["Epic generation started"]
+    clear_updates(9001)
+
+
+@pytest.mark.asyncio
+async def test_waiter_times_out_without_updates():
+    """Test that waiting returns no updates once the timeout passes."""
+    emit_progress(9002, "research", "Research phase started")
+
+    assert await wait_for_updates(9002, from_index=1, timeout=0.01) == []
+    clear_updates(9002)
+
+
+@pytest.mark.asyncio
+async def test_burst_of_updates_wakes_stream_once():
+    """Test that updates emitted together are delivered to a waiting stream in one batch."""
+    waiter = asyncio.ensure_future(wait_for_updates(9003, timeout=5))
+    await asyncio.sleep(0)
+
+    for path in ("app/main.py", "app/models.py", "tests/test_main.py"):
+        emit_progress(9003, "code", f"Generating {path}")
+    updates = await asyncio.wait_for(waiter, timeout=1)
+
+    assert len(updates) == 3
+    clear_updates(9003)
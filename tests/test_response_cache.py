@@ -0,0 +1,218 @@
+"""
+Tests for the agent LLM response cache.
+"""
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.agents.base import truncate_tokens
+from app.agents.cache import ResponseCache, SemanticCache, response_cache
+from app.agents.code_agent import CodeAgent
+from app.agents.research_agent import ResearchAgent
+from app.agents.validation_agent import ValidationAgent
+
+
+def test_cache_hit_and_miss():
+    """Test that stored responses are returned for the same key only."""
+    cache = ResponseCache()
+    key = cache.make_key("gpt-4", 0.7, "prompt")
+
+    assert cache.get(key) is None
+    cache.set(key, "response", ttl=60)
+    assert cache.get(key) == "response"
+    assert cache.get(cache.make_key("gpt-4", 0.7, "other prompt")) is None
+
+
+def test_cache_expired_entry():
+    """Test that expired entries are treated as misses."""
+    cache = ResponseCache()
+    key = cache.make_key("gpt-4", 0.7, "prompt")
+
+    cache.set(key, "response", ttl=-1)
+    assert cache.get(key) is None
+
+
+def test_cache_evicts_least_recently_used():
+    """Test that the cache stays within its size limit."""
+    cache = ResponseCache(max_entries=2)
+    cache.set("a", "1", ttl=60)
+    cache.set("b", "2", ttl=60)
+    cache.get("a")
+    cache.set("c", "3", ttl=60)
+
+    assert cache.get("a") == "1"
+    assert cache.get("b") is None
+    assert cache.get("c") == "3"
+
+
+@pytest.mark.asyncio
+async def test_cached_invoke_skips_repeated_llm_call():
+    """Test that an identical prompt only reaches the LLM once."""
+    response_cache.clear()
+    agent = CodeAgent()
+    agent.llm = SimpleNamespace(ainvoke=AsyncMock(return_value=SimpleNamespace(content="code")))
+
+    assert await agent.cached_invoke("same prompt") == "code"
+    assert await agent.cached_invoke("same prompt") == "code"
+    assert agent.llm.ainvoke.await_count == 1
+
+    await agent.cached_invoke("same prompt", use_cache=False)
+    assert agent.llm.ainvoke.await_count == 2
+    response_cache.clear()
+
+
+@pytest.mark.asyncio
+async def test_cached_invoke_coalesces_concurrent_identical_prompts():
+    """Test that identical prompts issued concurrently share one LLM request."""
+    response_cache.clear()
+
+    async def slow_response(messages):
+        await asyncio.sleep(0.01)
+        return SimpleNamespace(content="epics")
+
+    agent = CodeAgent()
+    agent.llm = SimpleNamespace(ainvoke=AsyncMock(side_effect=slow_response))
+
+    results = await asyncio.gather(*(agent.cached_invoke("burst prompt") for _ in range(3)))
+    assert results == ["epics", "epics", "epics"]
+    assert agent.llm.ainvoke.await_count == 1
+    response_cache.clear()
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_keeps_inflight_call_shared():
+    """Test that an identical prompt joins the running call after the first caller is cancelled."""
+    response_cache.clear()
+    release = asyncio.Event()
+
+    async def slow_response(messages):
+        await release.wait()
+        return SimpleNamespace(content="epics")
+
+    agent = CodeAgent()
+    agent.llm = SimpleNamespace(ainvoke=AsyncMock(side_effect=slow_response))
+
+    first = asyncio.ensure_future(agent.cached_invoke("cancelled prompt"))
+    await asyncio.sleep(0)
+    first.cancel()
+    second = asyncio.ensure_future(agent.cached_invoke("cancelled prompt"))
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await second == "epics"
+    assert agent.llm.ainvoke.await_count == 1
+    response_cache.clear()
+
+
+def test_semantic_cache_matches_similar_embedding():
+    """Test that only sufficiently similar embeddings within a namespace hit."""
+    cache = SemanticCache()
+    cache.add("ResearchAgent", cache.normalize([1.0, 0.0]), "todo research", ttl=60)
+
+    assert cache.lookup("ResearchAgent", cache.normalize([0.99, 0.05]), 0.95) == "todo research"
+    assert cache.lookup("ResearchAgent", cache.normalize([0.0, 1.0]), 0.95) is None
+    assert cache.lookup("EpicAgent", cache.normalize([1.0, 0.0]), 0.95) is None
+
+
+@pytest.mark.asyncio
+async def test_cached_invoke_streams_chunks():
+    """Test that on_chunk receives each streamed delta and the full text is returned."""
+    async def astream(messages):
+        for delta in ("## File: ", "main.py", ""):
+            yield SimpleNamespace(content=delta)
+
+    agent = CodeAgent()
+    agent.llm = SimpleNamespace(astream=astream)
+    chunks = []
+
+    content = await agent.cached_invoke("stream prompt", use_cache=False, on_chunk=chunks.append)
+    assert content == "## File: main.py"
+    assert chunks == ["## File: ", "main.py"]
+
+
+def test_truncate_tokens_respects_budget():
+    """Test that prompt inputs are cut to the token budget and short text is untouched."""
+    assert truncate_tokens("short text", 100) == "short text"
+
+    truncated = truncate_tokens("word " * 1000, 50)
+    assert 0 < len(truncated) < len("word " * 1000)
+
+
+def test_research_knowledge_base_in_system_prefix(tmp_path, monkeypatch):
+    """Test that the research corpus is loaded into the static system prompt."""
+    from app.agents import research_agent
+
+    corpus = tmp_path / "kb.md"
+    corpus.write_text("Offline-first apps sync with CRDTs.", encoding="utf-8")
+    monkeypatch.setattr(research_agent.settings, "research_knowledge_base_path", str(corpus))
+
+    agent = research_agent.ResearchAgent()
+    assert agent.SYSTEM_PROMPT.endswith("## Knowledge Base\nOffline-first apps sync with CRDTs.\n")
+    assert agent.knowledge_base_hash == research_agent.load_knowledge_base(str(corpus))[1]
+    assert research_agent.ResearchAgent.SYSTEM_PROMPT not in ("", agent.SYSTEM_PROMPT)
+
+
+@pytest.mark.asyncio
+async def test_cache_is_partitioned_by_agent():
+    """Test that different agents never share a cached response for the same prompt."""
+    response_cache.clear()
+    code_agent, validation_agent = CodeAgent(), ValidationAgent()
+    for agent in (code_agent, validation_agent):
+        agent.llm = SimpleNamespace(ainvoke=AsyncMock(return_value=SimpleNamespace(content="out")))
+
+    await code_agent.cached_invoke("shared prompt", system_prompt="")
+    await validation_agent.cached_invoke("shared prompt", system_prompt="")
+
+    assert validation_agent.llm.ainvoke.await_count == 1
+    response_cache.clear()
+
+
+@pytest.mark.asyncio
+async def test_research_cache_ignores_whitespace():
+    """Test that research prompts differing only in whitespace share a cache entry."""
+    response_cache.clear()
+    agent = ResearchAgent()
+    agent.llm = SimpleNamespace(ainvoke=AsyncMock(return_value=SimpleNamespace(content="findings")))
+
+    await agent.cached_invoke("Build a  todo\napp")
+    await agent.cached_invoke("Build a todo app ")
+
+    assert agent.llm.ainvoke.await_count == 1
+    response_cache.clear()
+
+
+@pytest.mark.asyncio
+async def test_code_agent_reports_files_while_streaming():
+    """Test that file headers are reported as soon as their line has streamed in."""
+    async def astream(messages):
+        for delta in ("## File: app/ma", "in.py\n```python\n", "pass\n```\n## File: tests/test_main.py\n"):
+            yield SimpleNamespace(content=delta)
+
+    agent = CodeAgent()
+    agent.llm = SimpleNamespace(astream=astream)
+    files = []
+
+    result = await agent.execute({"specs": "streamed specs", "on_file": files.append})
+    assert files == ["app/main.py", "tests/test_main.py"]
+    assert result["metadata"]["file_count"] == 2
+    response_cache.clear()
+
+
+@pytest.mark.asyncio
+async def test_regeneration_prompt_extends_original_prefix():
+    """Test that feedback is appended after the stable prompt prefix so provider prompt caching applies."""
+    from app.agents.epic_agent import EpicAgent
+
+    agent = EpicAgent()
+    agent.llm = SimpleNamespace(ainvoke=AsyncMock(return_value=SimpleNamespace(content="### Epic EP-001")))
+    request = {"product_request": "Build a todo app", "research": "Findings"}
+
+    await agent.execute(request)
+    await agent.execute({**request, "feedback": "Split auth out", "regeneration_count": 1})
+
+    (first,), (second,) = (call.args for call in agent.llm.ainvoke.await_args_list)
+    assert first[0].content == second[0].content
+    assert second[1].content.startswith(first[1].content.rstrip())
+    response_cache.clear()
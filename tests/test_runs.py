@@ -1,6 +1,8 @@
 """
 Tests for run endpoints.
 """
+import pytest
+
 from app.database import Artifact, ArtifactType, Project, Run, RunStatus
 
 
@@ -297,3 +299,16 @@ def test_get_run_stories_not_found(client, auth_token):
         headers={"Authorization": f"Bearer {auth_token}"}
     )
     assert response.status_code == 404
+
+
+def test_run_status_stored_as_validated_string(db, test_user):
+    """Test that run status round-trips as an enum and unknown values are rejected."""
+    project = Project(name="Test Project", product_request="Build something", owner_id=test_user.id)
+    run = Run(project=project, status="paused")
+    db.add(run)
+    db.commit()
+    db.expire_all()
+
+    assert db.get(Run, run.id).status is RunStatus.PAUSED
+    with pytest.raises(ValueError):
+        run.status = "archived"
@@ -0,0 +1,64 @@
+"""
+Tests for per-epic story generation.
+"""
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.agents.story_agent import StoryAgent
+
+EPICS = """# Epics
+Shared context: offline-first mobile app
+
+### Epic EP-001: Accounts
+**Goal:** Sign up and log in
+
+### Epic EP-002: Tasks
+**Goal:** Manage todo items
+"""
+
+
+def test_split_epics():
+    """Test that the epics document is split at each epic heading, keeping the shared preamble."""
+    sections = StoryAgent._split_epics(EPICS)
+
+    assert len(sections) == 2
+    assert all(section.startswith("# Epics\nShared context") for section in sections)
+    assert "### Epic EP-001" in sections[0] and "EP-002" not in sections[0]
+    assert sections[1].endswith("**Goal:** Manage todo items")
+
+
+def test_renumber_stories_across_epics():
+    """Test that story IDs restart per epic are renumbered into one unique sequence."""
+    sections = [
+        "### Story US-001: Sign up\n### Story US-002: Log in (after US-001)",
+        "### Story US-001: Add task\n### Story US-002: Edit task\n### Story US-003: Delete task",
+    ]
+
+    first, second = StoryAgent._renumber_stories(sections)
+
+    assert first == "### Story US-001: Sign up\n### Story US-002: Log in (after US-001)"
+    assert second == "### Story US-003: Add task\n### Story US-004: Edit task\n### Story US-005: Delete task"
+
+
+@pytest.mark.asyncio
+async def test_stories_generated_per_epic():
+    """Test that each epic gets its own LLM call and results keep epic order."""
+    async def respond(messages):
+        prompt = messages[-1].content
+        epic = "EP-002" if "EP-002" in prompt else "EP-001"
+        return SimpleNamespace(content=f"### Story US-001: Story for {epic}")
+
+    agent = StoryAgent()
+    agent.llm = SimpleNamespace(ainvoke=AsyncMock(side_effect=respond))
+
+    result = await agent.execute({"epics": EPICS, "regeneration_count": 1})
+
+    assert result["success"] is True
+    assert result["content"] == (
+        "### Story US-001: Story for EP-001\n\n### Story US-002: Story for EP-002"
+    )
+    assert result["metadata"]["story_count"] == 2
+    prompts = [call.args[0][-1].content for call in agent.llm.ainvoke.await_args_list]
+    assert all("Shared context" in prompt for prompt in prompts)
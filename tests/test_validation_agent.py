@@ -0,0 +1,39 @@
+"""
+Tests for validation report parsing.
+"""
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.agents.validation_agent import ValidationAgent
+
+
+@pytest.mark.parametrize("report,score", [
+    ("## Validation Report\n\n### Overall Score: 8/10\n", 8),
+    ("**Overall Score:** 7 / 10", 7),
+    ("## Validation Report\nNo score given", 0),
+])
+@pytest.mark.asyncio
+async def test_overall_score_parsed(report, score):
+    """Test that the overall score is read from the report."""
+    agent = ValidationAgent()
+    agent.llm = SimpleNamespace(ainvoke=AsyncMock(return_value=SimpleNamespace(content=report)))
+
+    result = await agent.execute({"code": f"print({score})"})
+
+    assert result["metadata"]["overall_score"] == score
+
+
+def test_long_code_keeps_head_tail_and_risky_lines():
+    """Test that over-budget code keeps its ends and risky lines from the middle."""
+    agent = ValidationAgent()
+    code = "import os\n" + "x = 1\n" * 2000 + "subprocess.run(cmd, shell=True)\n" + "y = 2\n" * 2000 + "def main(): pass\n"
+
+    selected = agent._select_code(code)
+
+    assert selected.startswith("import os\n")
+    assert selected.endswith("def main(): pass\n")
+    assert "subprocess.run(cmd, shell=True)" in selected
+    assert len(selected) < len(code)
+    assert agent._select_code("print(1)\n") == "print(1)\n"